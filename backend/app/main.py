@@ -1,33 +1,56 @@
+import time
+
+# Awal cold start, untuk laporan waktu startup
+process_started = time.perf_counter()
+
 from fastapi import Depends, FastAPI, Request
 # from fastapi.templating import Jinja2Templates
 # from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import Request
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+import asyncio
 import os
 
 load_dotenv()
 
-from app.services.supabase import supabase_router, get_validated_domains
+from app.services.supabase import supabase_router, allowed_origins, check_supabase_health, startup_timings
 from app.services.task_manager import taskmanager_router
 from app.services.simple_rbfl_system import rbfl_router
+import app.services.rebalance as rebalance
+
+startup_timings["imports"] = time.perf_counter() - process_started
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Daftar origin CORS dimuat di background, startup tidak menunggu Supabase
+    refresher = asyncio.create_task(allowed_origins.refresh_forever())
+    startup_timings["ready"] = time.perf_counter() - process_started
+    print("Startup timings (ms):", ", ".join(f"{name} {seconds*1000:.1f}" for name, seconds in startup_timings.items()))
+    yield
+    refresher.cancel()
+    # Worker rebalance dihentikan di sini, tidak dibiarkan ke atexit
+    await asyncio.to_thread(rebalance.shutdown_pool)
 
 app = FastAPI(
     title="TaskHub-Hazel's API Documentation",  # Title of the API
     description="This is where you can find out how to use all available APIs in this project. Currently there are only authtentication routes",  # Description of the API
     version="1.0.0",  # Version of the API
     docs_url="/docs",  # URL path for the Swagger docs (default is /docs)
-    redoc_url="/redoc"  # URL path for the ReDoc docs (optional)
+    redoc_url="/redoc",  # URL path for the ReDoc docs (optional)
+    lifespan=lifespan
 )
 
-allowed_origins = get_validated_domains()
-print(allowed_origins)
+class AllowListCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware checking origins against the in-memory allow-list, which is refreshed while the app runs."""
+    def is_allowed_origin(self, origin: str) -> bool:
+        return origin in allowed_origins
 
 # CORS Middleware
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins,
+    AllowListCORSMiddleware,
     allow_credentials=True,
     allow_methods=["*"],  # Mengizinkan semua metode (GET, POST, dll.)
     allow_headers=["*"],  # Mengizinkan semua header
@@ -42,6 +65,16 @@ async def home(request: Request):
     # Example: Get tasks from Supabase or another service
     return {"message": "This is the default route, used for health checking"}
 
+@app.get("/health", response_class=JSONResponse, summary="Checks the Supabase connection and reports startup timings")
+async def health(request: Request):
+    supabase_health = await check_supabase_health()
+    content = {
+        "supabase": supabase_health,
+        "cors_origins": allowed_origins.stats(),
+        "startup_timings": startup_timings
+    }
+    return JSONResponse(status_code=200 if supabase_health["ok"] else 503, content=content)
+
 # @app.get("/register", response_class=HTMLResponse, summary="This is the route for registration")
 # async def register(request: Request):
 #     pass
@@ -57,5 +90,4 @@ app.include_router(supabase_router)
 app.include_router(taskmanager_router)
 app.include_router(rbfl_router)
 
-for route in app.routes:
-    print(route.path, route.name)
\ No newline at end of file
+startup_timings["app"] = time.perf_counter() - process_started - startup_timings["imports"]
\ No newline at end of file
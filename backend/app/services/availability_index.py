@@ -0,0 +1,229 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+
+# Bounds of the in-process availability index: members kept and seconds before a member is reloaded
+AVAILABILITY_INDEX_SIZE = 10000
+AVAILABILITY_INDEX_TTL_SECONDS = 300
+
+def to_timestamp(value: str) -> float:
+    """
+    POSIX timestamp of an ISO 8601 string as stored in the availability table. Values
+    without an offset are taken as UTC, not as the server's local time.
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+class MemberAvailability:
+    def __init__(self, intervals: Iterable[Tuple[float, float]] = ()):
+        """
+        Availability of one member as sorted, merged, non-overlapping intervals.
+
+        The raw intervals are kept as well so removing one entry does not drop time that
+        another, overlapping entry still covers.
+
+        Args:
+            intervals: (start, end) timestamp pairs, in any order and possibly overlapping
+        """
+        self._raw: List[Tuple[float, float]] = sorted((start, end) for start, end in intervals if end > start)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        for start, end in self._raw:
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+        self._cumulative = [0.0]
+        self._update_cumulative(0)
+
+    def _update_cumulative(self, first: int) -> None:
+        """Recompute the running covered-seconds totals from merged interval first on."""
+        del self._cumulative[first + 1:]
+        total = self._cumulative[first]
+        for start, end in zip(self.starts[first:], self.ends[first:]):
+            total += end - start
+            self._cumulative.append(total)
+
+    def add(self, start: float, end: float) -> None:
+        """Add an interval, merging it with the ones it overlaps or touches."""
+        if end <= start:
+            return
+        insort(self._raw, (start, end))
+
+        # Merged intervals [first, last) overlap the new one
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+        self._update_cumulative(first)
+
+    def remove(self, start: float, end: float) -> bool:
+        """Remove one raw interval previously added. Returns False if it is not present."""
+        position = bisect_left(self._raw, (start, end))
+        if position == len(self._raw) or self._raw[position] != (start, end):
+            return False
+        del self._raw[position]
+        self._rebuild()
+        return True
+
+    def _covered_before(self, moment: float) -> float:
+        """Seconds of availability before moment."""
+        count = bisect_right(self.starts, moment)
+        covered = self._cumulative[count]
+        if count > 0 and self.ends[count - 1] > moment:
+            covered -= self.ends[count - 1] - moment
+        return covered
+
+    def hours_between(self, start: Optional[float] = None, end: Optional[float] = None) -> float:
+        """
+        Available hours within [start, end) in O(log n). None leaves that side unbounded.
+        """
+        covered_until = self._cumulative[-1] if end is None else self._covered_before(end)
+        covered_from = 0.0 if start is None else self._covered_before(start)
+        return max(0.0, covered_until - covered_from)/3600
+
+    def intervals_between(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Merged intervals clipped to [start, end). None leaves that side unbounded."""
+        first = 0 if start is None else bisect_right(self.ends, start)
+        last = len(self.starts) if end is None else bisect_left(self.starts, end)
+        return [
+            (
+                self.starts[i] if start is None else max(self.starts[i], start),
+                self.ends[i] if end is None else min(self.ends[i], end)
+            )
+            for i in range(first, last)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+def common_slots(members: Iterable[MemberAvailability], min_members: int, min_duration: float = 0,
+                 start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float, int]]:
+    """
+    Windows where at least min_members of members are available, with a sweep line over all
+    their intervals in O(n log n).
+
+    Args:
+        members: Availability of every member taken into account
+        min_members: Number of members that must be free at the same time
+        min_duration: Shortest window returned, in seconds
+        start: Only look at time from here on, None for unbounded
+        end: Only look at time before this, None for unbounded
+
+    Returns:
+        (start, end, most members free at once) per window, in time order
+    """
+    events = []
+    for member in members:
+        for interval_start, interval_end in member.intervals_between(start, end):
+            events.append((interval_start, 1))
+            events.append((interval_end, -1))
+    events.sort()
+
+    slots = []
+    free = 0
+    slot_start = None
+    most_free = 0
+    for position, (moment, change) in enumerate(events):
+        free += change
+        # Apply every event at the same moment before looking at the count
+        if position + 1 < len(events) and events[position + 1][0] == moment:
+            continue
+        if free >= min_members:
+            if slot_start is None:
+                slot_start = moment
+                most_free = free
+            most_free = max(most_free, free)
+        elif slot_start is not None:
+            if moment - slot_start >= min_duration:
+                slots.append((slot_start, moment, most_free))
+            slot_start = None
+    return slots
+
+def group_availability(member_ids: Iterable[str], rows: Iterable[Dict[str, str]]) -> Dict[str, MemberAvailability]:
+    """MemberAvailability of every member in member_ids (and of any other member in rows) from availability rows."""
+    intervals: Dict[str, List[Tuple[float, float]]] = {member_id: [] for member_id in member_ids}
+    for row in rows:
+        intervals.setdefault(row["member_id"], []).append(
+            (to_timestamp(row["start_time"]), to_timestamp(row["end_time"]))
+        )
+    return {member_id: MemberAvailability(member_intervals) for member_id, member_intervals in intervals.items()}
+
+class AvailabilityIndex:
+    def __init__(self, max_size: int = AVAILABILITY_INDEX_SIZE, ttl: float = AVAILABILITY_INDEX_TTL_SECONDS):
+        """
+        Bounded in-process cache of MemberAvailability by member id.
+
+        Entries are loaded from the availability table once and then kept current by the
+        routes that add or remove availability. Entries older than ttl are reloaded, which
+        picks up changes made by other processes. Which rows an entry holds, for example only
+        those of a time window, is up to the caller of load.
+
+        Args:
+            max_size: Maximum number of members kept, the least recently loaded are dropped first
+            ttl: Seconds after which a member's entry is considered stale
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._members: Dict[str, Tuple[MemberAvailability, float]] = {}
+        self._lock = threading.Lock()
+
+    def missing(self, member_ids: Iterable[str]) -> List[str]:
+        """The member ids without a fresh entry."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                member_id for member_id in member_ids
+                if member_id not in self._members or now - self._members[member_id][1] > self.ttl
+            ]
+
+    def load(self, member_ids: Iterable[str], rows: Iterable[Dict[str, str]]) -> Dict[str, MemberAvailability]:
+        """Replace the entries of member_ids with their availability rows and return the new entries."""
+        loaded = group_availability(member_ids, rows)
+        loaded_at = time.monotonic()
+        with self._lock:
+            for member_id, member_availability in loaded.items():
+                self._members.pop(member_id, None)
+                self._members[member_id] = (member_availability, loaded_at)
+            while len(self._members) > self.max_size:
+                del self._members[next(iter(self._members))]
+        return loaded
+
+    def get(self, member_id: str) -> Optional[MemberAvailability]:
+        with self._lock:
+            entry = self._members.get(member_id)
+            return entry[0] if entry is not None else None
+
+    def add(self, member_id: str, start_time: str, end_time: str) -> None:
+        """Record a new availability row. Members that are not loaded pick it up when they are."""
+        with self._lock:
+            entry = self._members.get(member_id)
+            if entry is not None:
+                entry[0].add(to_timestamp(start_time), to_timestamp(end_time))
+
+    def remove(self, member_id: str, start_time: str, end_time: str) -> None:
+        """Forget a deleted availability row."""
+        with self._lock:
+            entry = self._members.get(member_id)
+            if entry is not None:
+                entry[0].remove(to_timestamp(start_time), to_timestamp(end_time))
+
+    def invalidate(self, member_ids: Iterable[str]) -> None:
+        with self._lock:
+            for member_id in member_ids:
+                self._members.pop(member_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._members.clear()
@@ -0,0 +1,211 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence
+import asyncio
+import multiprocessing
+import os
+
+import numpy as np
+
+import app.services.rule_based_fuzzy_logic as rbfl
+
+# Worker processes used to plan rebalances, so the solver never runs on the event loop
+REBALANCE_WORKERS = int(os.getenv("REBALANCE_WORKERS", "2"))
+
+# Largest tasks x capacity slots cost matrix a rebalance may solve
+REBALANCE_MAX_CELLS = int(os.getenv("REBALANCE_MAX_CELLS", "2000000"))
+
+# Bonus for leaving a task with its current member, small enough to only break ties
+STAY_BONUS = 1e-6
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pool() -> ProcessPoolExecutor:
+    """The rebalance process pool, started on first use."""
+    global _pool
+    if _pool is None:
+        # spawn: the workers only import this module, not the API and its open connections
+        _pool = ProcessPoolExecutor(max_workers=REBALANCE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def min_cost_assignment(cost: np.ndarray) -> np.ndarray:
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials) for a rectangular cost
+    matrix with no more rows than columns. O(n^2 m), the inner scan over columns is vectorized.
+
+    Args:
+        cost: (n, m) matrix, n <= m, cost[i, j] of giving column j to row i
+
+    Returns:
+        Column index of every row, all distinct, minimizing the total cost
+    """
+    n, m = cost.shape
+    if n > m:
+        raise ValueError("More rows than columns, no complete assignment exists")
+
+    # Index 0 is a virtual column used as the root of every augmenting path
+    row_potential = np.zeros(n + 1)
+    column_potential = np.zeros(m + 1)
+    column_row = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+
+    for row in range(1, n + 1):
+        column_row[0] = row
+        current_column = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[current_column] = True
+            current_row = column_row[current_column]
+            reduced = cost[current_row - 1] - row_potential[current_row] - column_potential[1:]
+
+            free = ~used[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = current_column
+
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+
+            row_potential[column_row[used]] += delta
+            column_potential[used] -= delta
+            min_reduced[1:][free] -= delta
+
+            current_column = next_column
+            if column_row[current_column] == 0:
+                break
+
+        # Flip the augmenting path
+        while current_column:
+            previous_column = way[current_column]
+            column_row[current_column] = column_row[previous_column]
+            current_column = previous_column
+
+    assignment = np.empty(n, dtype=int)
+    for column in range(1, m + 1):
+        if column_row[column]:
+            assignment[column_row[column] - 1] = column - 1
+    return assignment
+
+def _features(available_hours: float, task_count: float, priority_sum: float) -> List[float]:
+    # Same columns as task_manager.score_team_members
+    avg_priority = priority_sum/task_count if task_count > 0 else 5
+    return [available_hours, avg_priority]
+
+def assignment_suitability(assignees: Sequence[int], task_priorities: Sequence[int], available_hours: Sequence[float],
+                           task_counts: Sequence[int], priority_sums: Sequence[int]) -> float:
+    """
+    Total suitability of an assignment: every task is scored for its member as that member's
+    k-th extra task, in priority order, on top of the member's base workload.
+    """
+    rows = []
+    held_count: Dict[int, int] = {}
+    held_priority: Dict[int, int] = {}
+    for task in np.argsort(task_priorities, kind="stable"):
+        member = assignees[task]
+        held_count[member] = held_count.get(member, 0) + 1
+        held_priority[member] = held_priority.get(member, 0) + task_priorities[task]
+        rows.append(_features(
+            available_hours[member], task_counts[member] + held_count[member], priority_sums[member] + held_priority[member]
+        ))
+    if not rows:
+        return 0.0
+    system = rbfl.get_workload_availability_system()
+    return float(system.evaluate_batch(np.array(rows)).sum())
+
+def plan_rebalance(available_hours: Sequence[float], task_counts: Sequence[int], priority_sums: Sequence[int],
+                   capacities: Sequence[int], task_priorities: Sequence[int],
+                   current_assignees: Sequence[int]) -> Dict[str, Any]:
+    """
+    Reassign a team's tasks to maximize total suitability with at most capacities[m] tasks
+    per member. Runs in a worker process.
+
+    Every member gets one column per capacity slot. Slot k is scored with the fuzzy system
+    as the member's (k+1)-th task on top of its base workload, for each distinct task
+    priority, in a single batched evaluation. The tasks x slots matrix of negated scores is
+    then solved with min_cost_assignment.
+
+    Args:
+        available_hours: Available hours of every member
+        task_counts: Tasks of every member outside the ones being rebalanced
+        priority_sums: Priority sum of those tasks
+        capacities: Maximum number of rebalanced tasks every member may hold
+        task_priorities: Priority of every task being rebalanced
+        current_assignees: Member index holding every task now, -1 when not held by a member
+
+    Returns:
+        The member index of every task and the total suitability before and after
+    """
+    distinct_priorities = sorted(set(task_priorities))
+    mean_priority = float(np.mean(task_priorities))
+
+    slot_member = np.repeat(np.arange(len(capacities)), capacities)
+    slot_k = np.concatenate([np.arange(capacity) for capacity in capacities]) if len(slot_member) else np.array([], dtype=int)
+
+    # (slots x priorities) scores: earlier slots are assumed to hold tasks of the mean priority
+    rows = [
+        _features(
+            available_hours[member], task_counts[member] + k + 1, priority_sums[member] + k*mean_priority + priority
+        )
+        for member, k in zip(slot_member, slot_k)
+        for priority in distinct_priorities
+    ]
+    system = rbfl.get_workload_availability_system()
+    slot_scores = system.evaluate_batch(np.array(rows)).reshape(len(slot_member), len(distinct_priorities))
+
+    priority_column = np.searchsorted(distinct_priorities, task_priorities)
+    cost = -slot_scores[:, priority_column].T
+    # Between equally good plans prefer the one that moves the fewest tasks
+    current = np.asarray(current_assignees)
+    cost -= STAY_BONUS*(slot_member[np.newaxis, :] == current[:, np.newaxis])
+    assignees = slot_member[min_cost_assignment(cost)].tolist()
+
+    after = assignment_suitability(assignees, task_priorities, available_hours, task_counts, priority_sums)
+    before = None
+    if all(member >= 0 for member in current_assignees):
+        before = assignment_suitability(current_assignees, task_priorities, available_hours, task_counts, priority_sums)
+        # The slot scores approximate a member's load, keep a valid current assignment the plan does not beat
+        within_capacity = all(count <= capacity for count, capacity in zip(np.bincount(current, minlength=len(capacities)), capacities))
+        if within_capacity and before >= after:
+            assignees, after = list(current_assignees), before
+    return {
+        "assignees": assignees,
+        "suitability_before": before,
+        "suitability_after": after
+    }
+
+def shutdown_pool() -> None:
+    """Stop the rebalance workers once their running plans finish, a later get_pool starts new ones."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next get_pool starts a new one, unless it was already replaced."""
+    global _pool
+    if _pool is pool:
+        _pool = None
+    # A worker started by a submit that raced the breakage is never stopped by the pool
+    # itself and would block interpreter exit, stop every worker it still has
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def run_plan(*args: Any) -> Dict[str, Any]:
+    """
+    plan_rebalance in the process pool. A pool broken by a dead worker (killed, out of
+    memory) is replaced and the plan retried once, BrokenProcessPool is raised if that
+    fails too.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = get_pool()
+        try:
+            return await loop.run_in_executor(pool, plan_rebalance, *args)
+        except (BrokenProcessPool, OSError) as e:
+            # submit on a pool still being torn down after a worker died raises OSError
+            discard_pool(pool)
+            if attempt == 1:
+                raise BrokenProcessPool("Rebalance workers keep failing") from e
@@ -1,5 +1,50 @@
 import numpy as np
-from typing import Dict, List, Tuple, Callable, Union, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple, Callable, Union, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Number of points used to sample the output universe during defuzzification
+DEFAULT_RESOLUTION = 1000
+
+# Supported defuzzification methods: sampled or exact (analytic) center of gravity
+DEFUZZIFY_MODES = ("sample", "exact")
+
+# Supported inference methods: Mamdani (clip, aggregate, defuzzify) or zero-order Sugeno
+# (rule strength weighted average of the consequent set centroids)
+INFERENCE_MODES = ("mamdani", "sugeno")
+
+# Number of rows defuzzified together by FuzzySystem.evaluate_batch
+BATCH_CHUNK_SIZE = 256
+
+# Grid points per input axis used by FuzzySystem.precompute_surface
+DEFAULT_SURFACE_GRID = 101
+
+# Default bounds of a FuzzySystem result cache, inputs are rounded to this many decimals
+RESULT_CACHE_SIZE = 4096
+RESULT_CACHE_PRECISION = 3
+
+# Bounds of the process-wide registry of built systems
+REGISTRY_MAX_SIZE = 256
+REGISTRY_TTL_SECONDS = 3600
+
+def trapezoid(x: np.ndarray, a: float, b: float, c: float, d: float) -> np.ndarray:
+    """
+    Vectorized trapezoid membership function.
+    
+    For a <= b <= c <= d it gives the same values as FuzzyVariable._trapezoid for every
+    element of x, including the degenerate shoulders where a == b or c == d.
+    """
+    x = np.asarray(x, dtype=float)
+    rising = (x - a) / (b - a) if b != a else np.where(x >= a, 1.0, 0.0)
+    falling = (d - x) / (d - c) if d != c else np.where(x <= d, 1.0, 0.0)
+    return np.clip(np.minimum(rising, falling), 0.0, 1.0)
 
 class FuzzyVariable:
     def __init__(self, name: str, range_min: float, range_max: float, sets: Dict[str, List[float]]):
@@ -24,6 +69,10 @@ class FuzzyVariable:
             memberships[set_name] = self._trapezoid(value, *params)
         return memberships
     
+    def get_membership_curves(self, x: np.ndarray) -> np.ndarray:
+        """Calculate membership curves of all sets over x, one row per set."""
+        return np.array([trapezoid(x, *params) for params in self.sets.values()])
+    
     def _trapezoid(self, x: float, a: float, b: float, c: float, d: float) -> float:
         """Calculate trapezoid membership value."""
         if x < a or x > d:
@@ -55,72 +104,572 @@ class FuzzyRule:
         ]
         return min(antecedent_values)  # Using AND operator
 
+class CompiledRuleBase:
+    def __init__(self, input_variables: Dict[str, FuzzyVariable], output_variable: FuzzyVariable,
+                 rules: List[FuzzyRule]):
+        """
+        Compile a list of rules into integer index arrays.
+        
+        Every (variable, set) pair of the inputs becomes a column of a flat membership
+        matrix, so rule firing is one fancy-indexed min-reduce over that matrix and
+        aggregation is one max-reduce per group of rules sharing a consequent.
+        
+        Args:
+            input_variables: Input variables of the system, in column order
+            output_variable: Output variable whose sets are the rule consequents
+            rules: Rules to compile
+        """
+        # Column of every (variable_name, set_name) pair in the membership matrix
+        self.columns: Dict[Tuple[str, str], int] = {}
+        for var_name, variable in input_variables.items():
+            for set_name in variable.sets:
+                self.columns[(var_name, set_name)] = len(self.columns)
+        
+        # Extra all-ones column, used to pad rules with fewer antecedents
+        self.padding_column = len(self.columns)
+        self.output_sets = list(output_variable.sets)
+        
+        width = max((len(rule.antecedents) for rule in rules), default=1)
+        self.antecedent_index = np.full((len(rules), width), self.padding_column, dtype=np.intp)
+        self.consequent_index = np.zeros(len(rules), dtype=np.intp)
+        for i, rule in enumerate(rules):
+            for j, antecedent in enumerate(rule.antecedents):
+                if tuple(antecedent) not in self.columns:
+                    raise ValueError(f"Rule {i} uses unknown input set {antecedent}")
+                self.antecedent_index[i, j] = self.columns[tuple(antecedent)]
+            if rule.consequent[1] not in self.output_sets:
+                raise ValueError(f"Rule {i} uses unknown output set {rule.consequent}")
+            self.consequent_index[i] = self.output_sets.index(rule.consequent[1])
+        
+        # Rules sorted by consequent so each output set is a contiguous reduceat group
+        self.rule_order = np.argsort(self.consequent_index, kind="stable")
+        self.group_sets, self.group_starts = np.unique(
+            self.consequent_index[self.rule_order], return_index=True
+        )
+    
+    def fire(self, memberships: np.ndarray) -> np.ndarray:
+        """Firing strength of every rule (AND as minimum), shape (N, number of rules)."""
+        return memberships[:, self.antecedent_index].min(axis=2)
+    
+    def aggregate(self, firing: np.ndarray) -> np.ndarray:
+        """Strength of every output set (OR as maximum), shape (N, number of output sets)."""
+        strengths = np.zeros((firing.shape[0], len(self.output_sets)))
+        if len(self.rule_order):
+            strengths[:, self.group_sets] = np.maximum.reduceat(
+                firing[:, self.rule_order], self.group_starts, axis=1
+            )
+        return strengths
+
+class ResultCache:
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, precision: int = RESULT_CACHE_PRECISION):
+        """
+        Bounded LRU cache of evaluation results keyed by quantized inputs.
+        
+        Args:
+            max_size: Maximum number of results kept
+            precision: Number of decimals inputs are rounded to before lookup
+        """
+        self.max_size = max_size
+        self.precision = precision
+        self._results: "OrderedDict[Tuple[float, ...], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def quantize(self, inputs: np.ndarray) -> np.ndarray:
+        """Round input rows to the cache precision."""
+        return np.round(inputs, self.precision)
+    
+    def get(self, key: Tuple[float, ...]) -> Optional[float]:
+        """Return the cached result for a quantized input row, or None."""
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self._results.move_to_end(key)
+                self.hits += 1
+            return result
+    
+    def put(self, key: Tuple[float, ...], result: float) -> None:
+        """Store a result, evicting the least recently used one when full."""
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            if len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every cached result, keeping the counters."""
+        with self._lock:
+            self._results.clear()
+            self.invalidations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size, for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._results),
+                "max_size": self.max_size,
+                "precision": self.precision,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
 class FuzzySystem:
-    def __init__(self):
+    def __init__(self, defuzzify: str = "sample", resolution: int = DEFAULT_RESOLUTION,
+                 inference: str = "mamdani"):
+        """
+        Initialize an empty fuzzy system.
+        
+        Args:
+            defuzzify: "sample" computes the center of gravity over `resolution` evenly spaced
+                points of the output range, "exact" integrates the piecewise linear union of
+                the clipped trapezoids analytically
+            resolution: Number of sample points used by the "sample" method
+            inference: "mamdani" defuzzifies the aggregated output curve, "sugeno" returns the
+                firing strength weighted average of the consequent set centroids and never
+                builds a curve (defuzzify and resolution are then unused)
+        """
+        if defuzzify not in DEFUZZIFY_MODES:
+            raise ValueError(f"Unknown defuzzification method: {defuzzify}")
+        if resolution < 2:
+            raise ValueError("Resolution must be at least 2")
+        if inference not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference method: {inference}")
+        self.defuzzify = defuzzify
+        self.resolution = resolution
+        self.inference = inference
+        
         self.input_variables: Dict[str, FuzzyVariable] = {}
         self.output_variable: Optional[FuzzyVariable] = None
         self.rules: List[FuzzyRule] = []
+        
+        # Output universe and per-set curves, built once on first evaluation
+        self._output_universe: Optional[np.ndarray] = None
+        self._output_curves: Optional[np.ndarray] = None
+        
+        # Breakpoints and sloped edges of the output sets, used by exact defuzzification
+        self._output_edges: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        
+        # Centroid of every output set, used by Sugeno inference
+        self._set_centroids: Optional[np.ndarray] = None
+        
+        # Index-array form of the rules, rebuilt whenever the definition changes
+        self._rule_base: Optional[CompiledRuleBase] = None
+        
+        # Precomputed output surface of a two-input system, see precompute_surface
+        self._surface: Optional[Tuple[List[np.ndarray], np.ndarray]] = None
+        self.surface_error: Optional[float] = None
+        
+        # Optional memoization of results, see enable_result_cache
+        self.result_cache: Optional[ResultCache] = None
+        
+        # Optional callback receiving a trace of every engine run, see set_trace
+        self.trace: Optional[Callable[[Dict[str, Any]], None]] = None
 
     def add_input_variable(self, name: str, range_min: float, range_max: float, 
                          sets: Dict[str, List[float]]) -> None:
         """Add an input variable to the system."""
         self.input_variables[name] = FuzzyVariable(name, range_min, range_max, sets)
+        self._definition_changed()
 
     def set_output_variable(self, name: str, range_min: float, range_max: float,
                           sets: Dict[str, List[float]]) -> None:
         """Set the output variable for the system."""
         self.output_variable = FuzzyVariable(name, range_min, range_max, sets)
+        self._output_universe = None
+        self._output_curves = None
+        self._output_edges = None
+        self._set_centroids = None
+        self._definition_changed()
 
     def add_rule(self, antecedents: List[Tuple[str, str]], consequent: Tuple[str, str]) -> None:
         """Add a rule to the system."""
         self.rules.append(FuzzyRule(antecedents, consequent))
+        self._definition_changed()
+
+    def _definition_changed(self) -> None:
+        """Drop everything derived from the variables and rules."""
+        self._rule_base = None
+        self._surface = None
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def enable_result_cache(self, max_size: int = RESULT_CACHE_SIZE,
+                            precision: int = RESULT_CACHE_PRECISION) -> ResultCache:
+        """
+        Memoize evaluation results.
+        
+        Inputs are rounded to `precision` decimals and evaluated at the rounded values, so
+        every input that rounds to the same key gets the same result. The cache is cleared
+        whenever variables or rules are added.
+        """
+        self.result_cache = ResultCache(max_size=max_size, precision=precision)
+        return self.result_cache
+
+    def disable_result_cache(self) -> None:
+        """Stop memoizing evaluation results."""
+        self.result_cache = None
+
+    def set_trace(self, callback: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+        """
+        Report every engine run to callback, or stop tracing with None.
+        
+        The callback receives a dict with the input rows, per-stage timings in seconds
+        (fuzzify, fire, aggregate, defuzzify), the memberships of every input set, the rule
+        and output set strengths and the outputs. Results answered by the surface or the
+        result cache never reach the engine and are not traced. Without a callback the
+        engine takes no timings and builds no trace.
+        """
+        self.trace = callback
+
+    def compile(self) -> CompiledRuleBase:
+        """Compile the rules into index arrays, reusing the last compilation if nothing changed."""
+        if self._rule_base is None:
+            self._rule_base = CompiledRuleBase(self.input_variables, self.output_variable, self.rules)
+        return self._rule_base
+
+    def _get_output_curves(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sampled output universe and the membership curve of every output set."""
+        if self._output_curves is None:
+            self._output_universe = np.linspace(
+                self.output_variable.range_min, self.output_variable.range_max, self.resolution
+            )
+            self._output_curves = self.output_variable.get_membership_curves(self._output_universe)
+        return self._output_universe, self._output_curves
+
+    def _get_output_edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return the fixed breakpoints of the output sets and the slope and intercept of every
+        sloped trapezoid edge.
+        
+        Fixed breakpoints are the range limits, the trapezoid corners and the crossings
+        between edges of different sets; none of them depend on the firing strengths.
+        """
+        if self._output_edges is None:
+            output = self.output_variable
+            points = [output.range_min, output.range_max]
+            slopes, intercepts = [], []
+            for a, b, c, d in output.sets.values():
+                points.extend([a, b, c, d])
+                if b != a:
+                    slopes.append(1 / (b - a))
+                    intercepts.append(-a / (b - a))
+                if d != c:
+                    slopes.append(-1 / (d - c))
+                    intercepts.append(d / (d - c))
+            for i in range(len(slopes)):
+                for j in range(i + 1, len(slopes)):
+                    if slopes[i] != slopes[j]:
+                        points.append((intercepts[j] - intercepts[i]) / (slopes[i] - slopes[j]))
+            self._output_edges = (np.array(points), np.array(slopes), np.array(intercepts))
+        return self._output_edges
+
+    def precompute_surface(self, grid_size: int = DEFAULT_SURFACE_GRID) -> float:
+        """
+        Precompute the output surface of a two-input system for constant time evaluation.
+        
+        The output is evaluated on a grid_size x grid_size grid spanning both input ranges.
+        Afterwards evaluate and evaluate_batch answer in-range inputs by bilinear
+        interpolation of that grid; out-of-range inputs still go through the engine.
+        Changing the variables or rules drops the surface.
+        
+        Args:
+            grid_size: Number of grid points per input axis
+        
+        Returns:
+            Maximum absolute interpolation error against the engine, measured on a grid
+            twice as fine (also stored as surface_error)
+        """
+        if len(self.input_variables) != 2:
+            raise ValueError("Surface mode needs exactly two input variables")
+        if grid_size < 2:
+            raise ValueError("Grid size must be at least 2")
+        for variable in self.input_variables.values():
+            if variable.range_max <= variable.range_min:
+                raise ValueError(f"Input variable {variable.name} has an empty range")
+        
+        self._surface = None
+        axes = [
+            np.linspace(variable.range_min, variable.range_max, grid_size)
+            for variable in self.input_variables.values()
+        ]
+        values = self._infer(_grid_points(axes)).reshape(grid_size, grid_size)
+        
+        # Compare against the engine on the grid nodes and every cell and edge midpoint
+        check_axes = [
+            np.linspace(axis[0], axis[-1], 2 * grid_size - 1)
+            for axis in axes
+        ]
+        check_points = _grid_points(check_axes)
+        expected = self._infer(check_points)
+        
+        self._surface = (axes, values)
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        self.surface_error = float(np.max(np.abs(self._interpolate_surface(check_points) - expected)))
+        return self.surface_error
+
+    def _interpolate_surface(self, inputs: np.ndarray) -> np.ndarray:
+        """Bilinear interpolation of the precomputed surface at in-range input rows."""
+        axes, values = self._surface
+        indices, weights = [], []
+        for column, axis in enumerate(axes):
+            position = (inputs[:, column] - axis[0]) / (axis[-1] - axis[0]) * (len(axis) - 1)
+            index = np.clip(np.floor(position).astype(np.intp), 0, len(axis) - 2)
+            indices.append(index)
+            weights.append(position - index)
+        (i, j), (u, v) = indices, weights
+        return (
+            values[i, j] * (1 - u) * (1 - v) + values[i + 1, j] * u * (1 - v)
+            + values[i, j + 1] * (1 - u) * v + values[i + 1, j + 1] * u * v
+        )
+
+    def _surface_covers(self, inputs: np.ndarray) -> np.ndarray:
+        """Mask of the input rows that fall inside the precomputed surface."""
+        axes, _ = self._surface
+        return np.all([
+            (inputs[:, column] >= axis[0]) & (inputs[:, column] <= axis[-1])
+            for column, axis in enumerate(axes)
+        ], axis=0)
 
     def evaluate(self, inputs: Dict[str, float]) -> float:
         """Evaluate the system for given inputs."""
-        # Calculate memberships for all input variables
-        variable_states = {}
-        for var_name, value in inputs.items():
-            variable_states[var_name] = self.input_variables[var_name].get_membership(value)
-        print(variable_states)
-        
-        # Evaluate all rules
-        rule_outputs: Dict[str, List[float]] = {}
-        for rule in self.rules:
-            rule_strength = rule.evaluate(variable_states)
-            consequent_set = rule.consequent[1]
-            if consequent_set not in rule_outputs:
-                rule_outputs[consequent_set] = []
-            rule_outputs[consequent_set].append(rule_strength)
-        print(rule_outputs)
-        
-        # Aggregate rule outputs using maximum
-        aggregated_outputs = {
-            set_name: max(strengths)
-            for set_name, strengths in rule_outputs.items()
-        }
+        row = np.array([[inputs[var_name] for var_name in self.input_variables]], dtype=float)
+        if self.result_cache is None:
+            return self._evaluate_row(row)
+        
+        row = self.result_cache.quantize(row)
+        key = tuple(row[0].tolist())
+        result = self.result_cache.get(key)
+        if result is None:
+            result = self._evaluate_row(row)
+            self.result_cache.put(key, result)
+        return result
+
+    def _evaluate_row(self, row: np.ndarray) -> float:
+        """Evaluate a single input row through the surface or the engine."""
+        if self._surface is not None and self._surface_covers(row)[0]:
+            return float(self._interpolate_surface(row)[0])
+        return float(self._infer(row)[0])
+
+    def evaluate_batch(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the system for many inputs at once.
+        
+        Args:
+            inputs: Array of shape (N, k), one row per evaluation and one column per
+                input variable, in the order the variables were added to the system
+        
+        Returns:
+            Array of N defuzzified outputs, equal to calling evaluate on every row
+        """
+        inputs = np.atleast_2d(np.asarray(inputs, dtype=float))
+        if inputs.shape[1] != len(self.input_variables):
+            raise ValueError(
+                f"Expected {len(self.input_variables)} input columns, got {inputs.shape[1]}"
+            )
+        
+        if self.result_cache is None:
+            return self._evaluate_rows(inputs)
+        
+        inputs = self.result_cache.quantize(inputs)
+        keys = [tuple(row) for row in inputs.tolist()]
+        results = np.empty(inputs.shape[0])
+        missing = []
+        for i, key in enumerate(keys):
+            result = self.result_cache.get(key)
+            if result is None:
+                missing.append(i)
+            else:
+                results[i] = result
+        
+        if missing:
+            computed = self._evaluate_rows(inputs[missing])
+            results[missing] = computed
+            for i, result in zip(missing, computed.tolist()):
+                self.result_cache.put(keys[i], result)
+        return results
+
+    def _evaluate_rows(self, inputs: np.ndarray) -> np.ndarray:
+        """Evaluate input rows through the surface where it covers them, else the engine."""
+        if self._surface is None:
+            return self._infer(inputs)
+        
+        results = np.empty(inputs.shape[0])
+        covered = self._surface_covers(inputs)
+        results[covered] = self._interpolate_surface(inputs[covered])
+        if not covered.all():
+            results[~covered] = self._infer(inputs[~covered])
+        return results
+
+    def _infer(self, inputs: np.ndarray) -> np.ndarray:
+        """Run the fuzzy engine (fuzzify, fire, aggregate, defuzzify) on input rows."""
+        if self.trace is not None:
+            return self._traced_infer(inputs)
+        firing = self.compile().fire(self._fuzzify(inputs))
+        return self._conclude(firing)
+
+    def _traced_infer(self, inputs: np.ndarray) -> np.ndarray:
+        """_infer with every stage timed and reported to the trace callback."""
+        rule_base = self.compile()
+        started = time.perf_counter()
+        memberships = self._fuzzify(inputs)
+        fuzzified = time.perf_counter()
+        firing = rule_base.fire(memberships)
+        fired = time.perf_counter()
+        if self.inference == "sugeno":
+            strengths = None
+            aggregated = fired
+            outputs = self._weighted_centroid(firing)
+        else:
+            strengths = rule_base.aggregate(firing)
+            aggregated = time.perf_counter()
+            outputs = self._defuzzify(strengths)
+        finished = time.perf_counter()
+        
+        variable_states: Dict[str, Dict[str, np.ndarray]] = {}
+        for (var_name, set_name), column in rule_base.columns.items():
+            variable_states.setdefault(var_name, {})[set_name] = memberships[:, column]
+        self.trace({
+            "inputs": inputs,
+            "timings": {
+                "fuzzify": fuzzified - started,
+                "fire": fired - fuzzified,
+                "aggregate": aggregated - fired,
+                "defuzzify": finished - aggregated
+            },
+            "memberships": variable_states,
+            "rule_strengths": firing,
+            "set_strengths": strengths,
+            "outputs": outputs
+        })
+        return outputs
+
+    def _conclude(self, firing: np.ndarray) -> np.ndarray:
+        """Turn rule firing strengths of shape (N, number of rules) into N crisp outputs."""
+        if self.inference == "sugeno":
+            return self._weighted_centroid(firing)
+        
+        # Aggregate rule outputs using maximum, then defuzzify using center of gravity
+        return self._defuzzify(self.compile().aggregate(firing))
+
+    def _weighted_centroid(self, firing: np.ndarray) -> np.ndarray:
+        """Firing strength weighted average of every rule's consequent set centroid."""
+        rule_centroids = self._get_set_centroids()[self.compile().consequent_index]
+        numerator = firing @ rule_centroids
+        denominator = np.sum(firing, axis=1)
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    def _get_set_centroids(self) -> np.ndarray:
+        """Exact centroid of every output set on its own, within the output range."""
+        if self._set_centroids is None:
+            self._set_centroids = self._exact_centroid(np.eye(len(self.output_variable.sets)))
+        return self._set_centroids
+
+    def _fuzzify(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        Membership matrix of shape (N, number of input sets + 1).
+        
+        Columns follow CompiledRuleBase.columns, the last column is the all-ones padding.
+        """
+        memberships = np.ones((inputs.shape[0], self.compile().padding_column + 1))
+        column = 0
+        for i, variable in enumerate(self.input_variables.values()):
+            curves = variable.get_membership_curves(inputs[:, i])
+            memberships[:, column:column + len(curves)] = curves.T
+            column += len(curves)
+        return memberships
+
+    def _defuzzify(self, strengths: np.ndarray) -> np.ndarray:
+        """
+        Center of gravity defuzzification of aggregated set strengths.
+        
+        Args:
+            strengths: Array of shape (N, number of output sets)
+        """
+        if self.defuzzify == "exact":
+            return self._exact_centroid(strengths)
+        return self._sampled_centroid(strengths)
 
-        # Defuzzify using center of gravity
-        x = np.linspace(self.output_variable.range_min, self.output_variable.range_max, 1000)
+    def _sampled_centroid(self, strengths: np.ndarray) -> np.ndarray:
+        """Center of gravity over the sampled output universe."""
+        x, curves = self._get_output_curves()
+        results = np.zeros(strengths.shape[0])
         
-        output_curves = []
-        for set_name, strength in aggregated_outputs.items():
-            set_params = self.output_variable.sets[set_name]
-            curve = np.minimum(
-                strength,
-                np.array([self.output_variable._trapezoid(xi, *set_params) for xi in x])
+        # Work in chunks so the (rows x sets x points) intermediate stays small
+        for start in range(0, strengths.shape[0], BATCH_CHUNK_SIZE):
+            chunk = strengths[start:start + BATCH_CHUNK_SIZE]
+            combined_curve = np.max(np.minimum(chunk[:, :, None], curves[None, :, :]), axis=1)
+            numerator = combined_curve @ x
+            denominator = np.sum(combined_curve, axis=1)
+            results[start:start + BATCH_CHUNK_SIZE] = np.divide(
+                numerator, denominator,
+                out=np.zeros_like(numerator), where=denominator != 0
             )
-            output_curves.append(curve)
+        return results
 
-        combined_curve = np.maximum.reduce(output_curves) if output_curves else np.zeros_like(x)
+    def _exact_centroid(self, strengths: np.ndarray) -> np.ndarray:
+        """
+        Analytic center of gravity of the union of the clipped output trapezoids.
+        
+        The union is piecewise linear. Its kinks can only sit on the fixed breakpoints or
+        where a sloped edge reaches a firing strength, so between consecutive sorted
+        candidates it is a straight line, integrated exactly from two interior samples.
+        """
+        fixed_points, slopes, intercepts = self._get_output_edges()
+        n_rows = strengths.shape[0]
+        
+        # Where every sloped edge crosses every firing strength level
+        crossings = (strengths[:, None, :] - intercepts[None, :, None]) / slopes[None, :, None]
+        points = np.concatenate([
+            np.broadcast_to(fixed_points, (n_rows, len(fixed_points))),
+            crossings.reshape(n_rows, -1)
+        ], axis=1)
+        points = np.sort(np.clip(points, self.output_variable.range_min, self.output_variable.range_max), axis=1)
+        
+        x0 = points[:, :-1]
+        length = points[:, 1:] - x0
         
-        numerator = np.sum(x * combined_curve)
-        denominator = np.sum(combined_curve)
+        # Samples at 1/3 and 2/3 of each segment avoid the jumps of vertical edges at its ends
+        samples = self._combined_membership(
+            strengths, np.concatenate([x0 + length / 3, x0 + 2 * length / 3], axis=1)
+        )
+        m1, m2 = samples[:, :x0.shape[1]], samples[:, x0.shape[1]:]
+        
+        # On each segment the union is alpha + beta * t for t in [0, 1]
+        beta = 3 * (m2 - m1)
+        alpha = 2 * m1 - m2
+        area = length * (m1 + m2) / 2
+        moment = length * (x0 * (alpha + beta / 2) + length * (alpha / 2 + beta / 3))
         
-        return numerator / denominator if denominator != 0 else 0
+        numerator = np.sum(moment, axis=1)
+        denominator = np.sum(area, axis=1)
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    def _combined_membership(self, strengths: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """Union of the output sets clipped at their strengths, evaluated row-wise at x."""
+        combined = np.zeros_like(x)
+        for column, params in enumerate(self.output_variable.sets.values()):
+            np.maximum(combined, np.minimum(strengths[:, column, None], trapezoid(x, *params)), out=combined)
+        return combined
+
+def _grid_points(axes: List[np.ndarray]) -> np.ndarray:
+    """All combinations of the axis values, one row per grid point, first axis slowest."""
+    grids = np.meshgrid(*axes, indexing="ij")
+    return np.column_stack([grid.ravel() for grid in grids])
 
 # Example usage
-def create_workload_availability_system() -> FuzzySystem:
-    system = FuzzySystem()
+def create_workload_availability_system(defuzzify: str = "sample",
+                                        resolution: int = DEFAULT_RESOLUTION,
+                                        surface_grid: Optional[int] = None,
+                                        inference: str = "mamdani") -> FuzzySystem:
+    system = FuzzySystem(defuzzify=defuzzify, resolution=resolution, inference=inference)
     
     # Add workload input variable
     system.add_input_variable(
@@ -201,10 +750,15 @@ def create_workload_availability_system() -> FuzzySystem:
         consequent=("suitability", "low")
     )
     
+    if surface_grid is not None:
+        system.precompute_surface(surface_grid)
     return system
 
-def simple_fuzzy(input_variables: List) -> FuzzySystem:
-    system = FuzzySystem()
+def simple_fuzzy(input_variables: List, defuzzify: str = "sample",
+                 resolution: int = DEFAULT_RESOLUTION,
+                 surface_grid: Optional[int] = None,
+                 inference: str = "mamdani") -> FuzzySystem:
+    system = FuzzySystem(defuzzify=defuzzify, resolution=resolution, inference=inference)
     
     for variables in input_variables:
         system.add_input_variable(
@@ -261,19 +815,181 @@ def simple_fuzzy(input_variables: List) -> FuzzySystem:
     
     # Low var2
     system.add_rule(
-        antecedents=[(input_variables[0][0], "low"), ("availability", "low")],
+        antecedents=[(input_variables[0][0], "low"), (input_variables[1][0], "low")],
         consequent=("suitability", "medium")
     )
     system.add_rule(
-        antecedents=[(input_variables[0][0], "medium"), ("availability", "low")],
+        antecedents=[(input_variables[0][0], "medium"), (input_variables[1][0], "low")],
         consequent=("suitability", "low")
     )
     system.add_rule(
-        antecedents=[(input_variables[0][0], "high"), ("availability", "low")],
+        antecedents=[(input_variables[0][0], "high"), (input_variables[1][0], "low")],
         consequent=("suitability", "low")
     )
     
+    if surface_grid is not None:
+        system.precompute_surface(surface_grid)
     return system
+
+class SystemRegistry:
+    def __init__(self, max_size: int = REGISTRY_MAX_SIZE, ttl: float = REGISTRY_TTL_SECONDS):
+        """
+        Process-wide cache of built and compiled fuzzy systems with LRU eviction.
+        
+        Entries are keyed by a system key (e.g. an rbfl id) plus a hash of the config the
+        system was built from, so a changed definition never returns a stale system. Building
+        a key for a new config invalidates the systems of its older configs.
+        
+        Args:
+            max_size: Maximum number of unpinned systems kept
+            ttl: Seconds an unpinned system stays valid after it was built
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._systems: "OrderedDict[Tuple[str, str], Tuple[FuzzySystem, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get_or_build(self, key: str, config: Dict[str, Any], builder: Callable[[], FuzzySystem],
+                     pinned: bool = False) -> FuzzySystem:
+        """
+        Return the system registered for (key, config), building it on a miss.
+        
+        Args:
+            key: Identifier of the system
+            config: Definition the system is built from, hashed into the cache key
+            builder: Called without arguments to build the system on a miss
+            pinned: Pinned systems never expire and are never evicted
+        """
+        entry_key = (key, config_hash(config))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._systems.get(entry_key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._systems.move_to_end(entry_key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        # Build outside the lock, a concurrent miss at worst builds the same system twice
+        system = builder()
+        system.compile()
+        with self._lock:
+            # The definition of key changed, systems built from its older configs are stale
+            self._drop(key, keep=entry_key)
+            self._systems[entry_key] = (system, None if pinned else now + self.ttl)
+            self._systems.move_to_end(entry_key)
+            self._evict()
+        return system
+    
+    def invalidate(self, key: str) -> int:
+        """Drop every system registered under key, whatever its config. Returns the number dropped."""
+        with self._lock:
+            return self._drop(key)
+    
+    def clear(self) -> None:
+        """Drop every system and reset the counters."""
+        with self._lock:
+            self._systems.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size, for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._systems),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+    
+    def result_cache_stats(self) -> Dict[str, Any]:
+        """Result cache counters summed over the registered systems, for monitoring."""
+        with self._lock:
+            caches = [system.result_cache for system, _ in self._systems.values() if system.result_cache is not None]
+        totals = {"systems": len(caches), "size": 0, "hits": 0, "misses": 0, "invalidations": 0}
+        for cache in caches:
+            cache_stats = cache.stats()
+            for name in ("size", "hits", "misses", "invalidations"):
+                totals[name] += cache_stats[name]
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = totals["hits"] / lookups if lookups else 0.0
+        return totals
+    
+    def _drop(self, key: str, keep: Optional[Tuple[str, str]] = None) -> int:
+        """Drop the systems of key other than keep and clear their result caches (lock held)."""
+        stale = [entry_key for entry_key in self._systems if entry_key[0] == key and entry_key != keep]
+        for entry_key in stale:
+            system = self._systems.pop(entry_key)[0]
+            if system.result_cache is not None:
+                system.result_cache.clear()
+        self.invalidations += len(stale)
+        return len(stale)
+    
+    def _evict(self) -> None:
+        """Drop expired systems, then least recently used ones beyond max_size (lock held)."""
+        now = time.monotonic()
+        for entry_key, (_, expires_at) in list(self._systems.items()):
+            if expires_at is not None and expires_at <= now:
+                del self._systems[entry_key]
+                self.evictions += 1
+        unpinned = [entry_key for entry_key, (_, expires_at) in self._systems.items() if expires_at is not None]
+        for entry_key in unpinned[:max(0, len(unpinned) - self.max_size)]:
+            del self._systems[entry_key]
+            self.evictions += 1
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Stable hash of a system definition."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+# Registry shared by the whole process
+registry = SystemRegistry()
+
+def get_workload_availability_system() -> FuzzySystem:
+    """The built-in task assignment system, built once per process."""
+    return registry.get_or_build("workload_availability", {}, _registry_builder(create_workload_availability_system), pinned=True)
+
+def get_simple_fuzzy_system(rbfl_id: str, input_variables: List, inference: str = "mamdani") -> FuzzySystem:
+    """The simple_fuzzy system of an rbfl_systems definition, cached in the registry."""
+    return registry.get_or_build(
+        rbfl_id,
+        {"input_variables": input_variables, "inference": inference},
+        _registry_builder(lambda: simple_fuzzy(input_variables, inference=inference))
+    )
+
+def _registry_builder(builder: Callable[[], FuzzySystem]) -> Callable[[], FuzzySystem]:
+    """
+    Wrap a system builder so registry systems memoize their results.
+    
+    Setting the RBFL_TRACE environment variable also logs a trace of every engine run.
+    """
+    def build() -> FuzzySystem:
+        system = builder()
+        system.enable_result_cache()
+        if os.getenv("RBFL_TRACE"):
+            system.set_trace(log_trace)
+        return system
+    return build
+
+def log_trace(trace: Dict[str, Any]) -> None:
+    """Trace callback that logs stage timings, memberships and rule strengths at DEBUG level."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    timings = ", ".join(f"{stage}={seconds * 1000:.3f}ms" for stage, seconds in trace["timings"].items())
+    logger.debug("Fuzzy engine run on %d rows: %s", len(trace["inputs"]), timings)
+    logger.debug("Memberships: %s", {
+        var_name: {set_name: values.tolist() for set_name, values in sets.items()}
+        for var_name, sets in trace["memberships"].items()
+    })
+    logger.debug("Rule strengths: %s", trace["rule_strengths"].tolist())
     
 if __name__ == '__main__':
     # Create and test the system
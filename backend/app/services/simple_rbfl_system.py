@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Request
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 import os
 import app.services.rule_based_fuzzy_logic as rbfl
@@ -9,17 +9,31 @@ import uuid
 
 rbfl_router = APIRouter()
 
+# Validasi object yang dikirimkan ke database
+class Simple_RBFL(BaseModel):
+    id: str
+    creator_key: str
+    variable1_name: str
+    variable1_min: int
+    variable1_max: int
+    variable2_name: str
+    variable2_min: int
+    variable2_max: int
+    inference: Literal["mamdani", "sugeno"] = "mamdani"
+
 # Endpoint: Membuat simple rbfl
 @rbfl_router.post("/create-rbfl", summary="create a new rule based fuzzy logic for your service")
 async def create_rbfl(request: Request):
-    if supabase.validate_api_key(request):
+    if await supabase.validate_api_key(request):
         new_rbfl_details = await request.json()   
         new_rbfl_details["creator_key"] = request.headers.get("API-Key")
         new_rbfl_details["id"] = str(uuid.uuid4())
         if "sandbox" not in request.headers:
             new_rbfl = Simple_RBFL(**new_rbfl_details)
             
-            response = supabase.client.table("rbfl_systems").insert(new_rbfl.model_dump()).execute()
+            # Mamdani (default) tidak dikirim, jadi tabel tanpa kolom inference tetap bisa dipakai;
+            # /rbfl-evaluate membaca nilai kosong sebagai mamdani
+            response = await supabase.run_query(supabase.client.table("rbfl_systems").insert(new_rbfl.model_dump(exclude_defaults=True)).execute)
             if response:
                 return {"message": "Rule Based Fuzzy Logic created successfully", "response": response}
             raise HTTPException(status_code=500, detail=response.model_dump_json())
@@ -37,13 +51,15 @@ async def create_rbfl(request: Request):
 # Endpoint: Memprediksi menggunakan simple rbfl
 @rbfl_router.get("/rbfl-evaluate", summary="Evaluates your rules against a new object with the variables you've set before.")
 async def predict_rbfl(request: Request):
-    if supabase.validate_api_key(request):
+    if await supabase.validate_api_key(request):
         if "sandbox" in request.headers:
             return { "message": "Evaluation Successful", "Evaluation Score": 99.99 }
         else:
-            lookup_rbfl = supabase.client.table("rbfl_systems").select("*")\
-                .eq("id", request.query_params.get("id"))\
-                .eq("creator_key", request.headers.get("API-Key")).data
+            lookup_rbfl = (await supabase.run_query(
+                supabase.client.table("rbfl_systems").select("*")
+                .eq("id", request.query_params.get("id"))
+                .eq("creator_key", request.headers.get("API-Key")).execute
+            )).data
             if len(lookup_rbfl) == 0:
                 raise HTTPException(status_code=404, detail="Rule Based Fuzzy Logic not found")
             else:
@@ -51,11 +67,20 @@ async def predict_rbfl(request: Request):
                     (lookup_rbfl[0]["variable1_name"], lookup_rbfl[0]["variable1_min"], lookup_rbfl[0]["variable1_max"]),
                     (lookup_rbfl[0]["variable2_name"], lookup_rbfl[0]["variable2_min"], lookup_rbfl[0]["variable2_max"])
                 ]
-                rbfl_router = rbfl.simple_fuzzy(input_variables)
+                rbfl_system = rbfl.get_simple_fuzzy_system(
+                    lookup_rbfl[0]["id"], input_variables, inference=lookup_rbfl[0].get("inference") or "mamdani"
+                )
                 
-                results = rbfl_router.evaluate([
-                    float(request.query_params.get("variable1")),
-                    float(request.query_params.get("variable2"))
-                ])
+                results = rbfl_system.evaluate({
+                    input_variables[0][0]: float(request.query_params.get("variable1")),
+                    input_variables[1][0]: float(request.query_params.get("variable2"))
+                })
                 
-                return {"message": "Evaluation successful", "Evaluation Score": results}
\ No newline at end of file
+                return {"message": "Evaluation successful", "Evaluation Score": results}
+
+# Endpoint: Statistik cache sistem rbfl
+@rbfl_router.get("/rbfl-registry-stats", summary="Shows hit/miss statistics of the built rule based fuzzy logic cache and of their result caches")
+async def rbfl_registry_stats(request: Request):
+    if await supabase.validate_api_key(request):
+        return {"message": "Registry statistics", "data": {**rbfl.registry.stats(), "result_cache": rbfl.registry.result_cache_stats()}}
+    raise HTTPException(status_code=401, detail="Invalid API key")
@@ -0,0 +1,357 @@
+"""
+Storage backends behind supabase.client.
+
+The services talk to their tables through the PostgREST table API of the Supabase client:
+table(), select() (with many-to-one embedded resources such as "teams(team_name)"), insert(),
+upsert(), update(), delete(), eq(), gt(), lt(), in_(), or_() (eq/gt/lt terms and and() groups), order(),
+limit(), range() and execute(). Any object whose table() returns a builder with those
+methods can stand in for Supabase, see StorageBackend.
+
+SQLiteStorage implements that interface on SQLite, with the tables in TABLES and indexes on
+the columns the services filter and order by. It needs no network access and is used for
+local development and load testing (STORAGE_BACKEND=sqlite). Supabase Auth is not covered.
+"""
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+import json
+import re
+import sqlite3
+import threading
+
+class Response:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+class QueryBuilder(Protocol):
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "QueryBuilder": ...
+    def insert(self, rows) -> "QueryBuilder": ...
+    def upsert(self, rows, on_conflict: str = "id") -> "QueryBuilder": ...
+    def update(self, values: Dict[str, Any]) -> "QueryBuilder": ...
+    def delete(self) -> "QueryBuilder": ...
+    def eq(self, column: str, value: Any) -> "QueryBuilder": ...
+    def gt(self, column: str, value: Any) -> "QueryBuilder": ...
+    def lt(self, column: str, value: Any) -> "QueryBuilder": ...
+    def in_(self, column: str, values: List[Any]) -> "QueryBuilder": ...
+    def or_(self, filters: str) -> "QueryBuilder": ...
+    def order(self, column: str, desc: bool = False) -> "QueryBuilder": ...
+    def limit(self, size: int) -> "QueryBuilder": ...
+    def range(self, start: int, end: int) -> "QueryBuilder": ...
+    def execute(self) -> Response: ...
+
+class StorageBackend(Protocol):
+    def table(self, table_name: str) -> QueryBuilder: ...
+
+# Kolom (dengan tipe SQLite), primary key dan index tiap tabel. Id disimpan sebagai TEXT,
+# nilai int pada filter ikut dikonversi oleh SQLite. Kolom id INTEGER (identity di Supabase)
+# diisi otomatis saat insert.
+TABLES: Dict[str, Dict[str, Any]] = {
+    "teams": {
+        "columns": {"team_id": "TEXT", "team_name": "TEXT", "created_at": "TEXT", "creator_id": "TEXT"},
+        "primary_key": "team_id",
+        "indexes": [("creator_id", "team_id")]
+    },
+    "team_members": {
+        "columns": {"member_id": "TEXT", "member_name": "TEXT", "team_id": "TEXT", "role": "TEXT", "created_at": "TEXT"},
+        "primary_key": "member_id",
+        "indexes": [("team_id", "member_id")]
+    },
+    "availability": {
+        "columns": {
+            "id": "INTEGER", "member_id": "TEXT", "team_id": "TEXT", "start_time": "TEXT", "end_time": "TEXT", "created_at": "TEXT"
+        },
+        "primary_key": "id",
+        "indexes": [("member_id", "start_time"), ("team_id", "member_id", "start_time", "id")]
+    },
+    "task": {
+        "columns": {
+            "id": "INTEGER", "team_id": "TEXT", "task_name": "TEXT", "priority": "INTEGER", "assigned_to": "TEXT", "created_at": "TEXT"
+        },
+        "primary_key": "id",
+        "indexes": [("team_id", "task_name", "id"), ("assigned_to", "id")]
+    },
+    "rbfl_systems": {
+        "columns": {
+            "id": "TEXT", "creator_key": "TEXT",
+            "variable1_name": "TEXT", "variable1_min": "REAL", "variable1_max": "REAL",
+            "variable2_name": "TEXT", "variable2_min": "REAL", "variable2_max": "REAL",
+            "inference": "TEXT", "created_at": "TEXT"
+        },
+        "primary_key": "id",
+        "indexes": [("creator_key",)]
+    },
+    "API_KEYS": {
+        "columns": {"domain": "TEXT", "key": "TEXT", "created_at": "TEXT"},
+        "primary_key": None,
+        "indexes": [("domain",)]
+    },
+    "member_workload": {
+        "columns": {
+            "member_id": "TEXT", "task_count": "INTEGER", "priority_sum": "INTEGER", "updated_at": "TEXT"
+        },
+        "primary_key": "member_id",
+        "indexes": []
+    },
+    "id_sequences": {
+        "columns": {"name": "TEXT", "last_value": "INTEGER"},
+        "primary_key": "name",
+        "indexes": []
+    }
+}
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+EMBEDDED = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)\((.*)\)$")
+
+def is_unique_violation(error: Exception) -> bool:
+    """Whether error is a unique key conflict, from PostgREST (Postgres code 23505) or SQLite."""
+    if isinstance(error, sqlite3.IntegrityError):
+        return "UNIQUE" in str(error)
+    return getattr(error, "code", None) == "23505"
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name, rejecting anything that is not a plain identifier."""
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return f'"{name}"'
+
+def split_terms(filters: str) -> List[str]:
+    """Split a PostgREST logic string on the commas outside parentheses and quotes."""
+    terms, depth, quoted, current = [], 0, False, ""
+    for position, char in enumerate(filters):
+        if char == '"' and (position == 0 or filters[position - 1] != "\\"):
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(current)
+            current = ""
+            continue
+        current += char
+    terms.append(current)
+    return terms
+
+def parse_logic(filters: str) -> List[tuple]:
+    """
+    Parse the eq/gt/lt terms and and() groups of an or_() filter string.
+
+    Returns:
+        (operator, column, value) per term, and() groups as ("and", None, [terms])
+    """
+    conditions = []
+    for term in split_terms(filters):
+        if term.startswith("and(") and term.endswith(")"):
+            conditions.append(("and", None, parse_logic(term[4:-1])))
+            continue
+        column, operator, value = term.split(".", 2)
+        if operator not in ("eq", "gt", "lt"):
+            raise NotImplementedError(f"Unsupported filter operator: {operator}")
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        conditions.append((operator, column, value))
+    return conditions
+
+SQL_OPERATORS = {"eq": "=", "gt": ">", "lt": "<"}
+
+def condition_sql(condition: tuple) -> Tuple[str, List[Any]]:
+    """SQL and parameters of one filter condition."""
+    operator, column, value = condition
+    if operator in ("or", "and"):
+        parts = [condition_sql(term) for term in value]
+        if not parts:
+            return ("0" if operator == "or" else "1"), []
+        joiner = " OR " if operator == "or" else " AND "
+        return "(" + joiner.join(sql for sql, _ in parts) + ")", [param for _, params in parts for param in params]
+    if operator == "in":
+        if not value:
+            return "0", []
+        return f"{quote_identifier(column)} IN ({', '.join('?' for _ in value)})", list(value)
+    return f"{quote_identifier(column)} {SQL_OPERATORS[operator]} ?", [value]
+
+class SQLiteQuery:
+    def __init__(self, storage: "SQLiteStorage", table_name: str):
+        self._storage = storage
+        self._table_name = table_name
+        self._table = quote_identifier(table_name)
+        self._action = "select"
+        self._columns = "*"
+        self._embedded: List[str] = []
+        self._payload: List[Dict[str, Any]] = []
+        self._conflict_column: Optional[str] = None
+        self._filters: List[tuple] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "SQLiteQuery":
+        self._action = "select"
+        if columns.strip() != "*":
+            self._columns = ", ".join(self._column_sql(column.strip()) for column in split_terms(columns))
+        return self
+
+    def _column_sql(self, column: str) -> str:
+        embedded = EMBEDDED.match(column)
+        if embedded is None:
+            return f"{self._table}.{quote_identifier(column)}" if column != "*" else f"{self._table}.*"
+
+        # Resource lain diambil lewat primary key-nya yang juga menjadi kolom tabel ini,
+        # seperti team_members.team_id -> teams.team_id
+        other_name, other_columns = embedded.groups()
+        other = self._storage.tables[other_name]
+        key = other["primary_key"]
+        if key is None or key not in self._storage.tables[self._table_name]["columns"]:
+            raise NotImplementedError(f"No many-to-one relation from {self._table_name} to {other_name}")
+        names = list(other["columns"]) if other_columns.strip() == "*" else [name.strip() for name in other_columns.split(",")]
+        pairs = ", ".join(f"'{name}', embedded.{quote_identifier(name)}" for name in names)
+        self._embedded.append(other_name)
+        return (
+            f"(SELECT json_object({pairs}) FROM {quote_identifier(other_name)} AS embedded "
+            f"WHERE embedded.{quote_identifier(key)} = {self._table}.{quote_identifier(key)}) AS {quote_identifier(other_name)}"
+        )
+
+    def insert(self, rows) -> "SQLiteQuery":
+        self._action = "insert"
+        self._payload = [dict(row) for row in (rows if isinstance(rows, list) else [rows])]
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id") -> "SQLiteQuery":
+        self._action = "upsert"
+        self._payload = [dict(row) for row in (rows if isinstance(rows, list) else [rows])]
+        self._conflict_column = on_conflict
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "SQLiteQuery":
+        self._action = "update"
+        self._payload = [dict(values)]
+        return self
+
+    def delete(self) -> "SQLiteQuery":
+        self._action = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "SQLiteQuery":
+        self._filters.append(("eq", column, value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "SQLiteQuery":
+        self._filters.append(("gt", column, value))
+        return self
+
+    def lt(self, column: str, value: Any) -> "SQLiteQuery":
+        self._filters.append(("lt", column, value))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "SQLiteQuery":
+        self._filters.append(("in", column, list(values)))
+        return self
+
+    def or_(self, filters: str) -> "SQLiteQuery":
+        self._filters.append(("or", None, parse_logic(filters)))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "SQLiteQuery":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> "SQLiteQuery":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> "SQLiteQuery":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def _where(self) -> Tuple[str, List[Any]]:
+        if not self._filters:
+            return "", []
+        sql, params = condition_sql(("and", None, self._filters))
+        return f" WHERE {sql}", params
+
+    def _write(self, rows: List[Dict[str, Any]], conflict_column: Optional[str]) -> List[Dict[str, Any]]:
+        """Insert or upsert rows in one transaction and return them as stored, generated ids included."""
+        statements = []
+        for row in rows:
+            quoted = [quote_identifier(column) for column in row]
+            sql = f"INSERT INTO {self._table} ({', '.join(quoted)}) VALUES ({', '.join('?' for _ in row)})"
+            if conflict_column is not None:
+                updates = [f"{column} = excluded.{column}" for column in quoted if column != quote_identifier(conflict_column)]
+                sql += f" ON CONFLICT ({quote_identifier(conflict_column)}) DO " + (f"UPDATE SET {', '.join(updates)}" if updates else "NOTHING")
+            statements.append((sql + " RETURNING *", list(row.values())))
+        return self._storage.execute_each(statements)
+
+    def execute(self) -> Response:
+        if self._action in ("insert", "upsert"):
+            return Response(self._write(self._payload, self._conflict_column if self._action == "upsert" else None))
+
+        where, params = self._where()
+        if self._action == "delete":
+            return Response(self._storage.execute(f"DELETE FROM {self._table}{where} RETURNING *", params))
+        if self._action == "update":
+            values = self._payload[0]
+            assignments = ", ".join(f"{quote_identifier(column)} = ?" for column in values)
+            return Response(self._storage.execute(
+                f"UPDATE {self._table} SET {assignments}{where} RETURNING *", list(values.values()) + params
+            ))
+
+        sql = f"SELECT {self._columns} FROM {self._table}{where}"
+        if self._order:
+            sql += " ORDER BY " + ", ".join(f"{quote_identifier(column)} {'DESC' if desc else 'ASC'}" for column, desc in self._order)
+        if self._limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [self._limit, self._offset]
+        rows = self._storage.execute(sql, params)
+        for row in rows:
+            for name in self._embedded:
+                row[name] = json.loads(row[name]) if row[name] is not None else None
+        return Response(rows)
+
+class SQLiteStorage:
+    def __init__(self, path: str = ":memory:", tables: Dict[str, Dict[str, Any]] = TABLES):
+        """
+        SQLite implementation of StorageBackend. Creates the tables and their indexes if they
+        do not exist yet. One connection is shared by the query threads, behind a lock.
+
+        Args:
+            path: Database file, ":memory:" for a database that lives as long as the process
+            tables: Table definitions, see TABLES
+        """
+        self.path = path
+        self.tables = tables
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        with self.lock, self.connection:
+            if path != ":memory:":
+                self.connection.execute("PRAGMA journal_mode=WAL")
+            for table_name, table in tables.items():
+                self._create_table(table_name, table)
+
+    def _create_table(self, table_name: str, table: Dict[str, Any]) -> None:
+        columns = [
+            f"{quote_identifier(column)} {column_type}" + (" PRIMARY KEY" if column == table["primary_key"] else "")
+            for column, column_type in table["columns"].items()
+        ]
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {quote_identifier(table_name)} ({', '.join(columns)})")
+        for index_columns in table["indexes"]:
+            index_name = quote_identifier(f"{table_name}_{'_'.join(index_columns)}_idx")
+            self.connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {quote_identifier(table_name)} "
+                f"({', '.join(map(quote_identifier, index_columns))})"
+            )
+
+    def execute(self, sql: str, params: List[Any] = ()) -> List[Dict[str, Any]]:
+        """Run one statement in its own transaction and return its rows as dicts."""
+        with self.lock, self.connection:
+            self.round_trips += 1
+            return [dict(row) for row in self.connection.execute(sql, params).fetchall()]
+
+    def execute_each(self, statements: List[Tuple[str, List[Any]]]) -> List[Dict[str, Any]]:
+        """Run several statements in one transaction and return all their rows."""
+        with self.lock, self.connection:
+            self.round_trips += 1
+            return [dict(row) for sql, params in statements for row in self.connection.execute(sql, params).fetchall()]
+
+    def table(self, table_name: str) -> SQLiteQuery:
+        return SQLiteQuery(self, table_name)
@@ -1,46 +1,351 @@
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from fastapi.responses import JSONResponse, RedirectResponse
-from supabase import Client, create_client
-from typing import Optional
+from jose import jwt, JWTError
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
 from datetime import datetime
+import asyncio
+import functools
+import threading
+import time
 import uuid
 import os
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 supabase_router = APIRouter()
 
 # Supabase credentials
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# Penyimpanan di balik client: "supabase", atau "sqlite" (lihat storage.py) untuk development
+# lokal dan load test tanpa project Supabase
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+SQLITE_PATH = os.getenv("SQLITE_PATH", ":memory:")
+
+# Durasi (detik) tiap tahap startup, dilaporkan oleh main.py dan /health
+startup_timings = {}
+
 # Initialize Supabase client
-client: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Client dibuat saat pertama dipakai, bukan saat import, supaya cold start tidak menunggu
+# import library supabase. Modul lain tetap memakai supabase.client seperti biasa.
+client_lock = threading.Lock()
+
+def get_supabase_client() -> "Client":
+    """
+    The Supabase client, or the storage backend chosen by STORAGE_BACKEND, created on first
+    use. Safe to call from the query threads.
+    """
+    global client
+    try:
+        return client
+    except NameError:
+        pass
+    with client_lock:
+        if "client" not in globals():
+            started = time.perf_counter()
+            if STORAGE_BACKEND == "sqlite":
+                from app.services.storage import SQLiteStorage
+                client = SQLiteStorage(SQLITE_PATH)
+            elif STORAGE_BACKEND == "supabase":
+                from supabase import create_client
+                client = create_client(SUPABASE_URL, SUPABASE_KEY)
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+            startup_timings["supabase_client"] = time.perf_counter() - started
+    return client
+
+def __getattr__(name):
+    # Dipanggil hanya selama client belum dibuat
+    if name == "client":
+        return get_supabase_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def reset_supabase_client():
+    """Drop the client so the next call builds a new one."""
+    with client_lock:
+        globals().pop("client", None)
+
+# Secret JWT project Supabase, untuk memverifikasi access token tanpa memanggil Supabase Auth
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
 
 base_url = os.getenv("BASE_URL")
 frontend_url = os.getenv("FRONTEND_URL")
 
-def validate_api_key(request: Request):
-    requester_domain_origin = request.headers.get("Origin")
-    
-    # Lookup domain key in db
+# Client Supabase bersifat sinkron, jadi setiap round trip dijalankan di thread pool terbatas
+# agar tidak memblokir event loop
+SUPABASE_MAX_WORKERS = int(os.getenv("SUPABASE_MAX_WORKERS", "16"))
+executor = ThreadPoolExecutor(max_workers=SUPABASE_MAX_WORKERS, thread_name_prefix="supabase")
+
+async def run_query(function, *args, **kwargs):
+    """
+    Run a blocking Supabase call (e.g. a query builder's execute) in the bounded thread pool
+    and wait for it without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(function, *args, **kwargs))
+
+# Batas waktu (detik) query health check ke Supabase
+SUPABASE_HEALTH_TIMEOUT = float(os.getenv("SUPABASE_HEALTH_TIMEOUT", "5"))
+
+supabase_health = {"ok": None, "checked_at": None, "latency": None, "error": None}
+
+async def check_supabase_health():
+    """
+    Run a one-row query against Supabase and record whether and how fast it answered. A
+    failed check resets the client, so a client left in a bad state is not reused.
+    """
+    started = time.perf_counter()
     try:
-        lookup_response = client.table("API_KEYS").select("*").eq("domain", requester_domain_origin).execute().data[0]["key"]
-        print(request.headers.get("API-Key"))
-        print(lookup_response)
+        await asyncio.wait_for(
+            run_query(lambda: get_supabase_client().table("API_KEYS").select("domain").limit(1).execute()),
+            SUPABASE_HEALTH_TIMEOUT
+        )
+        supabase_health.update(ok=True, error=None)
     except Exception as e:
         print(e)
+        supabase_health.update(ok=False, error=str(e) or type(e).__name__)
+        if STORAGE_BACKEND == "supabase":
+            # Database SQLite :memory: hilang bila client dibuat ulang
+            reset_supabase_client()
+    supabase_health.update(checked_at=datetime.now().isoformat(), latency=time.perf_counter() - started)
+    return dict(supabase_health)
+
+# Lama (detik) pasangan domain-key disimpan di memori, domain yang tidak terdaftar disimpan lebih singkat
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "60"))
+API_KEY_NEGATIVE_TTL = float(os.getenv("API_KEY_NEGATIVE_TTL", "10"))
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", "10000"))
+
+class ApiKeyCache:
+    """
+    Process-local cache of the API_KEYS table by domain, with a TTL per entry. Domains
+    without a key are cached as None for a shorter time so unknown origins do not hit
+    the database on every request either. Only used from the event loop.
+    """
+    def __init__(self, ttl=API_KEY_CACHE_TTL, negative_ttl=API_KEY_NEGATIVE_TTL, max_size=API_KEY_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, domain):
+        """(True, key or None) for a fresh entry, (False, None) when the database must be asked."""
+        entry = self.entries.get(domain)
+        if entry is None or entry[1] < time.monotonic():
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(domain)
+        if entry[0] is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, entry[0]
+    
+    def put(self, domain, key):
+        ttl = self.ttl if key is not None else self.negative_ttl
+        self.entries[domain] = (key, time.monotonic() + ttl)
+        self.entries.move_to_end(domain)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def invalidate(self, domain=None):
+        """Forget one domain, or every domain when domain is None."""
+        if domain is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(domain, None)
+        self.invalidations += 1
+    
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0
+        }
+
+api_key_cache = ApiKeyCache()
+
+async def validate_api_key(request: Request):
+    requester_domain_origin = request.headers.get("Origin")
+    
+    found, lookup_response = api_key_cache.get(requester_domain_origin)
+    if not found:
+        # Lookup domain key in db
+        try:
+            lookup_rows = (await run_query(
+                get_supabase_client().table("API_KEYS").select("*").eq("domain", requester_domain_origin).execute
+            )).data
+        except Exception as e:
+            print(e)
+            raise HTTPException(status_code=404, detail="Domain not found")
+        lookup_response = lookup_rows[0]["key"] if lookup_rows else None
+        api_key_cache.put(requester_domain_origin, lookup_response)
+    
+    if lookup_response is None:
         raise HTTPException(status_code=404, detail="Domain not found")
 
     return lookup_response == request.headers.get("API-Key")
 
 def get_validated_domains():
     # Lookup domain key in db
-    lookup_response = client.table("API_KEYS").select("domain").execute().data
+    lookup_response = get_supabase_client().table("API_KEYS").select("domain").execute().data
     
     return [domain["domain"] for domain in lookup_response]
 
+# Interval (detik) refresh daftar origin CORS dari tabel API_KEYS, dan origin yang selalu diizinkan
+CORS_REFRESH_SECONDS = float(os.getenv("CORS_REFRESH_SECONDS", "60"))
+CORS_STATIC_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
+
+class OriginAllowList:
+    """
+    Origins allowed by CORS, held in memory and refreshed from the API_KEYS table in the
+    background, so a newly registered domain is accepted without a restart and startup
+    does not wait on the query. Membership checks never touch the database.
+    """
+    def __init__(self, static_origins=CORS_STATIC_ORIGINS):
+        self.static_origins = frozenset(static_origins)
+        self.origins = self.static_origins
+        self.refreshed_at = None
+        self.refreshes = 0
+        self.failures = 0
+    
+    def __contains__(self, origin):
+        return origin in self.origins
+    
+    def add(self, origin):
+        # Set baru, bukan mutasi, supaya pembaca di thread lain selalu melihat set yang utuh
+        self.origins = self.origins | {origin}
+    
+    async def refresh(self):
+        domains = await run_query(get_validated_domains)
+        self.origins = self.static_origins | set(domains)
+        self.refreshed_at = datetime.now().isoformat()
+        self.refreshes += 1
+    
+    async def refresh_forever(self, interval=CORS_REFRESH_SECONDS):
+        """Refresh now and then every interval seconds, keeping the last list when a refresh fails."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.failures += 1
+                print("CORS origin refresh failed:", e)
+            await asyncio.sleep(interval)
+    
+    def stats(self):
+        return {
+            "size": len(self.origins),
+            "static": len(self.static_origins),
+            "refreshed_at": self.refreshed_at,
+            "refreshes": self.refreshes,
+            "failures": self.failures
+        }
+
+allowed_origins = OriginAllowList()
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+
+class IdentityCache:
+    """
+    User id of every access token seen recently, kept until the token expires. Bounded,
+    least recently used tokens are dropped first. Only used from the event loop.
+    """
+    def __init__(self, max_size=IDENTITY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, token):
+        entry = self.entries.get(token)
+        if entry is None or entry[1] <= time.time():
+            self.entries.pop(token, None)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(token)
+        self.hits += 1
+        return entry[0]
+    
+    def put(self, token, user_id, expires_at):
+        self.entries[token] = (user_id, expires_at)
+        self.entries.move_to_end(token)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+identity_cache = IdentityCache()
+
+async def resolve_access_token(access_token):
+    """
+    User id of a Supabase access token, or None when it is not valid. The token is verified
+    locally with SUPABASE_JWT_SECRET; without a secret Supabase Auth is asked instead.
+    """
+    user_id = identity_cache.get(access_token)
+    if user_id is not None:
+        return user_id
+    
+    if SUPABASE_JWT_SECRET:
+        try:
+            claims = jwt.decode(access_token, SUPABASE_JWT_SECRET, algorithms=["HS256"], audience=SUPABASE_JWT_AUDIENCE)
+        except JWTError as e:
+            print(e)
+            return None
+        user_id = claims.get("sub")
+    else:
+        try:
+            user_id = (await run_query(get_supabase_client().auth.get_user, access_token)).user.id
+            claims = jwt.get_unverified_claims(access_token)
+        except Exception as e:
+            print(e)
+            return None
+    
+    if user_id is not None and "exp" in claims:
+        identity_cache.put(access_token, user_id, float(claims["exp"]))
+    return user_id
+
+async def current_identity(request: Request):
+    """
+    Dependency giving the id of the caller: the user of the access_token cookie, or the
+    API-Key header when a service calls the API. Resolved once per request.
+    """
+    if hasattr(request.state, "identity"):
+        return request.state.identity
+    
+    access_token = request.cookies.get("access_token")
+    identity = await resolve_access_token(access_token) if access_token else None
+    if identity is None:
+        # Apabila service yang menembak API endpoint ini, bukan user dari webapp sendiri
+        identity = request.headers.get("API-Key")
+    request.state.identity = identity
+    return identity
+
 @supabase_router.post("/request-api-key", summary="This is used for user signup with classic email and password")
 async def request_api_key(request: Request):
-    if validate_api_key(request):
+    if await validate_api_key(request):
         req_body = await request.json()
         email = req_body['email']
         password = req_body['password']
@@ -48,7 +353,10 @@ async def request_api_key(request: Request):
         # Generate API key and save it in db
         try:
             new_key = str(uuid.uuid4())
-            client.table("API_KEYS").insert({"domain": request_body["domain"], "key": new_key, "created_at": datetime.now().isoformat()}).execute()
+            await run_query(get_supabase_client().table("API_KEYS").insert({"domain": req_body["domain"], "key": new_key, "created_at": datetime.now().isoformat()}).execute)
+            # Domain baru tidak boleh tertahan oleh cache negatif
+            api_key_cache.invalidate(req_body["domain"])
+            allowed_origins.add(req_body["domain"])
             return {"message": "API key generated successfully", "key": new_key}
         except Exception as e:
             print(e)
@@ -56,9 +364,15 @@ async def request_api_key(request: Request):
     else:
         raise HTTPException(status_code=403, detail="Invalid API key")
 
+@supabase_router.get("/api-key-cache-stats", summary="Shows hit/miss statistics of the API key validation cache")
+async def api_key_cache_stats(request: Request):
+    if await validate_api_key(request):
+        return {"message": "API key cache statistics", "data": api_key_cache.stats()}
+    raise HTTPException(status_code=401, detail="Invalid API key")
+
 @supabase_router.post("/user-signup", summary="This is used for user signup with classic email and password")
 async def signup(request: Request):
-    if validate_api_key(request):
+    if await validate_api_key(request):
         req_body = await request.json()
         email = req_body['email']
         password = req_body['password']
@@ -70,7 +384,7 @@ async def signup(request: Request):
         
         try:
             # client = get_supabase_client()
-            response = client.auth.sign_up({"email": email, "password": password})
+            response = await run_query(get_supabase_client().auth.sign_up, {"email": email, "password": password})
             return response
         except Exception as e:
             print(e)
@@ -82,7 +396,7 @@ async def signup(request: Request):
 async def signin(
     request: Request
 ):
-    if validate_api_key(request):
+    if await validate_api_key(request):
         
         req_body = await request.json()
         email = req_body['email']
@@ -95,7 +409,7 @@ async def signin(
         
         try:
             # client = get_supabase_client()
-            response = client.auth.sign_in_with_password({"email": email, "password": password})
+            response = await run_query(get_supabase_client().auth.sign_in_with_password, {"email": email, "password": password})
             token = response.session.access_token
             
             fastapi_response = RedirectResponse(url=frontend_url + "/home.html", status_code=302)
@@ -110,7 +424,7 @@ async def signin(
 @supabase_router.get("/github-signin", summary="This is used for user signup with the help of GitHub OAuth Application")
 async def github_signin(request: Request):
     try:
-        response = client.auth.sign_in_with_oauth(
+        response = get_supabase_client().auth.sign_in_with_oauth(
             {"provider": "github",
              "options": {
                  "redirect_to": base_url + "/callback"
@@ -124,7 +438,7 @@ async def github_signin(request: Request):
 async def google_signin(request: Request):
     try:
         # client = get_supabase_client()
-        response = client.auth.sign_in_with_oauth(
+        response = get_supabase_client().auth.sign_in_with_oauth(
             {"provider": "google",
              "options": {
                  "redirect_to": base_url + "/callback"
@@ -138,7 +452,7 @@ async def google_signin(request: Request):
 async def user_signout(request: Request):
     try:
         # client = get_supabase_client()
-        response = client.auth.sign_out()
+        response = await run_query(get_supabase_client().auth.sign_out)
         redirect_res = RedirectResponse(url=frontend_url + "/index.html", status_code=302)
         
         cookies_to_clear = ['session_id', 'auth_token', 'access_token']
@@ -156,7 +470,7 @@ def callback(request: Request):
     next = request.query_params.get("next", "/protected-home")
     if code:
         try:
-            res = client.auth.exchange_code_for_session({"auth_code": code})
+            res = get_supabase_client().auth.exchange_code_for_session({"auth_code": code})
             
             # Fixed session token extraction
             access_token = None
@@ -168,7 +482,7 @@ def callback(request: Request):
             if not access_token:
                 raise ValueError("No access token found in response")
             
-            user = client.auth.get_user()
+            user = get_supabase_client().auth.get_user()
             print(user)
             print()
             print("================================================================")
@@ -176,7 +490,7 @@ def callback(request: Request):
             for attr in user.__dict__:
                 print(f"{attr}: {user.__dict__[attr]}\n\n")
 
-            user_identities = client.auth.get_user().user.identities
+            user_identities = get_supabase_client().auth.get_user().user.identities
             print(user_identities)
             user_fullname = user_identities[0].identity_data["full_name"]
             print(f"User Fullname: {user_fullname}")
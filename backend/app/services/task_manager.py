@@ -1,13 +1,53 @@
 from fastapi import APIRouter, HTTPException, Depends, Header, Request
-from datetime import datetime
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
 from typing import List, Optional
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
 from pydantic import BaseModel
+import asyncio
+import base64
+import heapq
+import json
+import logging
+import math
+import numpy as np
 import os
+import random
+import time
 import app.services.rule_based_fuzzy_logic as rbfl
+import app.services.rebalance as rebalance
+from app.services.storage import is_unique_violation
+from app.services.availability_index import AvailabilityIndex, MemberAvailability, common_slots, group_availability, to_timestamp, AVAILABILITY_INDEX_TTL_SECONDS
 import app.services.supabase as supabase
 
 taskmanager_router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Batas jumlah nilai per filter in_ dan jumlah baris per halaman untuk query massal
+BULK_FILTER_SIZE = 500
+BULK_PAGE_SIZE = 1000
+
+# Primary key (kolom identity) tabel task dan availability, pemecah seri saat paging
+ROW_ID_COLUMN = "id"
+
+# Jumlah id yang dipesan sekaligus dari tabel id_sequences, dan batas percobaan saat kalah balapan
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "20"))
+ID_RESERVE_ATTEMPTS = int(os.getenv("ID_RESERVE_ATTEMPTS", "10"))
+# Jeda acak (detik) sebelum mencoba lagi setelah kalah balapan, berlipat dua tiap percobaan sampai batasnya
+ID_RESERVE_BACKOFF = float(os.getenv("ID_RESERVE_BACKOFF", "0.005"))
+ID_RESERVE_BACKOFF_MAX = float(os.getenv("ID_RESERVE_BACKOFF_MAX", "0.2"))
+
+# Hanya ketersediaan dalam jendela ini (dari sekarang) yang dihitung saat assignment, 0 berarti seluruh riwayat
+ASSIGNMENT_WINDOW_DAYS = float(os.getenv("ASSIGNMENT_WINDOW_DAYS", "14"))
+
+# Pemilik team (team_id -> creator_id) disimpan di memori untuk pengecekan otorisasi
+TEAM_OWNER_CACHE_TTL = float(os.getenv("TEAM_OWNER_CACHE_TTL", "300"))
+TEAM_OWNER_CACHE_SIZE = int(os.getenv("TEAM_OWNER_CACHE_SIZE", "10000"))
+
+availability_index = AvailabilityIndex(ttl=float(os.getenv("AVAILABILITY_INDEX_TTL", str(AVAILABILITY_INDEX_TTL_SECONDS))))
+
 # Validasi object yang dikirimkan ke database
 class Team(BaseModel):
     team_id: str
@@ -34,59 +74,499 @@ class Task(BaseModel):
     priority: int
     assigned_to: str
     created_at: str
+
+# Jam tersedia tidak disimpan di sini, skoring membacanya dari availability_index
+class MemberWorkload(BaseModel):
+    member_id: str
+    task_count: int
+    priority_sum: int
+    updated_at: str
     
 def validate_request_json(request_json, *keys_to_validate):
     for key in keys_to_validate:
         if key not in request_json:
             raise HTTPException(status_code=400, detail=f"Missing required key: {key}")
         
-def determine_task_assignee(team_id, task_priority):
-    req_member_ids = supabase.client.table("team_members").select("member_id").eq("team_id", team_id).execute().data
-    team_members = []
-    for member_id in req_member_ids:
-        team_members.append(member_id["member_id"])
-    
-    member_suitabilities = {}
-    for member_id in team_members:
-        print(member_id)
-        req_availability = supabase.client.table("availability").select("*").eq("member_id", member_id).execute().data
-        total_available_time = 0
-        for availability in req_availability:
-            start_time = datetime.fromisoformat(availability["start_time"])
-            end_time = datetime.fromisoformat(availability["end_time"])
-            curr_available_time = (end_time - start_time).total_seconds()/3600
-            total_available_time += curr_available_time
-        print(f"Member {member_id} has total available time of {total_available_time} for {len(req_availability)} entries")
-        
-        req_tasks = supabase.client.table("task").select("*").eq("assigned_to", member_id).execute().data
-        total_priority = 0
-        for task in req_tasks:
-            total_priority += int(task["priority"])
-        avg_priority = total_priority/len(req_tasks) if len(req_tasks) > 0 else 5
-        print(f"Member {member_id} has average priority of {avg_priority} for {len(req_tasks)} tasks")
-        
-        rbfl_system = rbfl.create_workload_availability_system()
-        suitability_score = rbfl_system.evaluate({
-            "workload": total_available_time,
-            "availability": avg_priority
-        })
-        member_suitabilities[member_id] = suitability_score
+async def fetch_rows_in(table, columns, column, values, key=ROW_ID_COLUMN, where=None):
+    """
+    Fetch every row of table whose column is one of values.
+    
+    The values are sent in batches of BULK_FILTER_SIZE to keep the request URL short, and
+    each batch is paged by BULK_PAGE_SIZE so the PostgREST max-rows limit never truncates it.
+    Pages follow a keyset on (column, key), key being the table's primary key, so no row is
+    repeated or skipped between pages. Batches are fetched concurrently. where, when given,
+    adds filters to every query and returns it.
+    """
+    order_columns = [column] if key == column else [column, key]
+    if columns.strip() != "*" and key not in [name.strip() for name in columns.split(",")]:
+        columns = f"{columns}, {key}"
+    
+    def batch_query(batch):
+        query = supabase.client.table(table).select(columns).in_(column, batch)
+        return where(query) if where else query
+    
+    async def fetch_batch(batch):
+        rows = []
+        async for page in iterate_pages(lambda: batch_query(batch), order_columns):
+            rows.extend(page)
+        return rows
+    
+    batches = await asyncio.gather(*[
+        fetch_batch(values[start:start + BULK_FILTER_SIZE])
+        for start in range(0, len(values), BULK_FILTER_SIZE)
+    ])
+    return [row for batch in batches for row in batch]
+
+async def fetch_team_member_ids(team_id):
+    """Member ids of a team."""
+    req_member_ids = (await supabase.run_query(
+        supabase.client.table("team_members").select("member_id").eq("team_id", team_id).execute
+    )).data
+    return [member_id["member_id"] for member_id in req_member_ids]
+
+class IdAllocator:
+    """
+    Hands out increasing numeric ids for a table without scanning it.
+    
+    Ids are reserved from the id_sequences row of the table in blocks of block_size with a
+    compare-and-set update, so every process gets its own block and concurrent requests never
+    share an id. Ids left in a block when the process stops are skipped, not reused.
+    Only lost races are retried, at most ID_RESERVE_ATTEMPTS times after a random, growing
+    pause so the losers do not collide again. Any other failure is a 500.
+    """
+    def __init__(self, table, column, block_size=ID_BLOCK_SIZE):
+        self.table = table
+        self.column = column
+        self.block_size = block_size
+        self.next_id = 0
+        self.last_id = -1
+        self.lock = asyncio.Lock()
+    
+    async def allocate(self):
+        async with self.lock:
+            if self.next_id > self.last_id:
+                self.next_id, self.last_id = await self._reserve_block()
+            new_id = self.next_id
+            self.next_id += 1
+            return str(new_id)
+    
+    async def _reserve_block(self):
+        start_value = None
+        for attempt in range(ID_RESERVE_ATTEMPTS):
+            if attempt > 0:
+                await asyncio.sleep(random.uniform(0, min(ID_RESERVE_BACKOFF*2**attempt, ID_RESERVE_BACKOFF_MAX)))
+            current = (await supabase.run_query(
+                supabase.client.table("id_sequences").select("last_value").eq("name", self.table).execute
+            )).data
+            if len(current) == 0:
+                # Sekali saja per tabel: mulai dari id terbesar yang sudah ada
+                if start_value is None:
+                    start_value = await self._max_id()
+                try:
+                    await supabase.run_query(
+                        supabase.client.table("id_sequences").insert({"name": self.table, "last_value": start_value}).execute
+                    )
+                except Exception as e:
+                    if not is_unique_violation(e):
+                        print(e)
+                        raise HTTPException(status_code=500, detail=f"Failed to start the id sequence of {self.table}")
+                    # Proses lain sudah membuat baris sequence lebih dulu
+                continue
+            
+            last_value = int(current[0]["last_value"])
+            reserved = (await supabase.run_query(
+                supabase.client.table("id_sequences")
+                .update({"last_value": last_value + self.block_size})
+                .eq("name", self.table)
+                .eq("last_value", last_value)
+                .execute
+            )).data
+            if len(reserved) > 0:
+                return last_value + 1, last_value + self.block_size
+        raise HTTPException(status_code=500, detail=f"Failed to reserve ids for {self.table}, try again")
+    
+    async def _max_id(self):
+        """Largest numeric id in the table, only used to start its sequence."""
+        max_id = 0
+        start = 0
+        while True:
+            page = (await supabase.run_query(
+                supabase.client.table(self.table).select(self.column).order(self.column).range(start, start + BULK_PAGE_SIZE - 1).execute
+            )).data
+            for row in page:
+                if str(row[self.column]).isdigit():
+                    max_id = max(max_id, int(row[self.column]))
+            if len(page) < BULK_PAGE_SIZE:
+                return max_id
+            start += BULK_PAGE_SIZE
+
+team_id_allocator = IdAllocator("teams", "team_id")
+member_id_allocator = IdAllocator("team_members", "member_id")
+
+class TeamOwnerCache:
+    """
+    Bounded cache of team_id -> creator_id with a TTL per entry, least recently used teams
+    are dropped first. /create-team primes it; anything that deletes a team or changes its
+    creator must call invalidate. Only used from the event loop.
+    """
+    def __init__(self, ttl=TEAM_OWNER_CACHE_TTL, max_size=TEAM_OWNER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
     
-    # Sort member suitability scores
-    sorted_suitability_scores = dict(sorted(member_suitabilities.items(), key=lambda item: item[1], reverse=True))
-    print(f"Sorted member suitability scores: {sorted_suitability_scores}")
+    def get(self, team_id):
+        entry = self.entries.get(str(team_id))
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        self.entries.move_to_end(str(team_id))
+        return entry[0]
+    
+    def put(self, team_id, creator_id):
+        self.entries[str(team_id)] = (creator_id, time.monotonic() + self.ttl)
+        self.entries.move_to_end(str(team_id))
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def invalidate(self, team_id):
+        self.entries.pop(str(team_id), None)
+
+team_owner_cache = TeamOwnerCache()
+
+async def get_team_creator(team_id):
+    """creator_id of team_id, or None when the team does not exist."""
+    creator_id = team_owner_cache.get(team_id)
+    if creator_id is None:
+        req_creator = (await supabase.run_query(
+            supabase.client.table("teams").select("creator_id").eq("team_id", team_id).execute
+        )).data
+        if len(req_creator) == 0:
+            return None
+        creator_id = req_creator[0]["creator_id"]
+        team_owner_cache.put(team_id, creator_id)
+    return creator_id
+
+async def check_team_owner(team_id, identity, detail):
+    """Raise 404 when team_id does not exist and 403 with detail when identity did not create it."""
+    creator_id = await get_team_creator(team_id)
+    if creator_id is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if creator_id != identity:
+        raise HTTPException(status_code=403, detail=detail)
+
+def encode_cursor(values):
+    """Opaque pagination cursor holding the ordering key of the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+def decode_cursor(cursor, order_columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(order_columns):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def postgrest_value(value):
+    """Quote a value for use inside a PostgREST or_() filter."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def keyset_query(query, order_columns, after):
+    """
+    Order query by order_columns and keep only the rows after the key values in after.
+    Together the columns must be unique, so end them with the table's primary key, or
+    rows sharing a key on a page boundary are skipped.
+    """
+    for column in order_columns:
+        query = query.order(column)
+    if after is None:
+        return query
+    if len(order_columns) == 1:
+        return query.gt(order_columns[0], after[0])
+    # (a, b, c) > (x, y, z): a > x, or a = x and b > y, or a = x and b = y and c > z
+    terms = []
+    for position, column in enumerate(order_columns):
+        equal = [f"{previous}.eq.{postgrest_value(value)}" for previous, value in zip(order_columns[:position], after)]
+        greater = f"{column}.gt.{postgrest_value(after[position])}"
+        terms.append(f"and({','.join(equal + [greater])})" if equal else greater)
+    return query.or_(",".join(terms))
+
+async def iterate_pages(build_query, order_columns, after=None, page_size=BULK_PAGE_SIZE):
+    """
+    Yield the rows of build_query() page by page on a stable keyset ordering, starting after
+    the key values in after. build_query is called once per page for a fresh query builder.
+    """
+    while True:
+        page = (await supabase.run_query(
+            keyset_query(build_query(), order_columns, after).limit(page_size).execute
+        )).data
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = [page[-1][column] for column in order_columns]
+
+async def list_response(message, build_query, order_columns, limit=None, cursor=None, stream=False):
+    """
+    Response of a list endpoint.
+
+    With stream, every row after cursor is sent as NDJSON while it is fetched, one page of
+    BULK_PAGE_SIZE at a time. With limit, one page of at most limit rows is returned with the
+    cursor of the next page (None on the last page). Otherwise all rows are returned.
+    """
+    after = decode_cursor(cursor, order_columns) if cursor else None
+    if limit is not None and not 1 <= limit <= BULK_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {BULK_PAGE_SIZE}")
+    
+    if stream:
+        async def rows_ndjson():
+            async for page in iterate_pages(build_query, order_columns, after):
+                yield "".join(json.dumps(row, default=str) + "\n" for row in page)
+        return StreamingResponse(rows_ndjson(), media_type="application/x-ndjson")
+    
+    if limit is not None:
+        data = (await supabase.run_query(
+            keyset_query(build_query(), order_columns, after).limit(limit).execute
+        )).data
+        next_cursor = encode_cursor([data[-1][column] for column in order_columns]) if len(data) == limit else None
+        return {"message": message, "data": data, "next_cursor": next_cursor}
+    
+    data = []
+    async for page in iterate_pages(build_query, order_columns, after):
+        data.extend(page)
+    return {"message": message, "data": data, "next_cursor": None}
+
+async def rebuild_member_workloads(member_ids):
+    """
+    Recompute the member_workload rows of member_ids from their full task history and store
+    them. Use it to backfill new members and to repair drift.
+    """
+    workloads = {
+        member_id: {"task_count": 0, "priority_sum": 0}
+        for member_id in member_ids
+    }
+    for task in await fetch_rows_in("task", "assigned_to, priority", "assigned_to", member_ids):
+        workloads[task["assigned_to"]]["task_count"] += 1
+        workloads[task["assigned_to"]]["priority_sum"] += int(task["priority"])
+    
+    updated_at = datetime.now().isoformat()
+    rows = [
+        MemberWorkload(member_id=member_id, updated_at=updated_at, **workload).model_dump()
+        for member_id, workload in workloads.items()
+    ]
+    await asyncio.gather(*[
+        supabase.run_query(
+            supabase.client.table("member_workload").upsert(rows[start:start + BULK_PAGE_SIZE], on_conflict="member_id").execute
+        )
+        for start in range(0, len(rows), BULK_PAGE_SIZE)
+    ])
+    return {row["member_id"]: row for row in rows}
+
+async def get_member_workloads(member_ids):
+    """Workload aggregate of every member in member_ids, rebuilding the ones that do not exist yet."""
+    workloads = {
+        row["member_id"]: row
+        for row in await fetch_rows_in("member_workload", "*", "member_id", member_ids, key="member_id")
+    }
+    missing = [member_id for member_id in member_ids if member_id not in workloads]
+    if missing:
+        workloads.update(await rebuild_member_workloads(missing))
+    return workloads
+
+async def apply_workload_change(member_id, task_count=0, priority_sum=0):
+    """
+    Add a change to a member's workload aggregate after its tasks changed.
+    
+    This is a read-modify-write, so concurrent changes to the same member can race;
+    rebuild_member_workloads repairs any drift from the raw rows.
+    """
+    current = (await supabase.run_query(
+        supabase.client.table("member_workload").select("*").eq("member_id", member_id).execute
+    )).data
+    if len(current) == 0:
+        # Belum ada agregat, bangun dari riwayat yang sudah memuat perubahan ini
+        await rebuild_member_workloads([member_id])
+        return
+    
+    workload = MemberWorkload(
+        member_id=member_id,
+        task_count=current[0]["task_count"] + task_count,
+        priority_sum=current[0]["priority_sum"] + priority_sum,
+        updated_at=datetime.now().isoformat()
+    )
+    await supabase.run_query(
+        supabase.client.table("member_workload").upsert(workload.model_dump(), on_conflict="member_id").execute
+    )
+
+def member_features(workload):
+    """Fuzzy inputs of a member from its workload aggregate: (total available time, average task priority)."""
+    task_count = workload["task_count"]
+    avg_priority = workload["priority_sum"]/task_count if task_count > 0 else 5
+    return workload["available_hours"], avg_priority
+
+def score_team_members(team_members, workloads):
+    """Suitability score of every member in team_members, from their workload aggregates."""
+    member_features_list = [list(member_features(workloads[member_id])) for member_id in team_members]
+    # Per anggota hanya saat debug, team besar tidak boleh menulis satu baris per anggota
+    if logger.isEnabledFor(logging.DEBUG):
+        for member_id, (total_available_time, avg_priority) in zip(team_members, member_features_list):
+            logger.debug("Member %s has total available time of %s and average priority of %s for %s tasks",
+                         member_id, total_available_time, avg_priority, workloads[member_id]["task_count"])
+    
+    # Score the whole team in one pass, columns follow the system's (workload, availability) inputs
+    rbfl_system = rbfl.get_workload_availability_system()
+    suitability_scores = rbfl_system.evaluate_batch(np.array(member_features_list).reshape(-1, 2))
+    return dict(zip(team_members, suitability_scores.tolist()))
+
+def rank_members(member_suitabilities, k):
+    """
+    The k best (member_id, score) pairs, best first, in O(n log k) instead of a full sort.
+    Ties keep the order of member_suitabilities, the same as a stable descending sort.
+    """
+    return heapq.nlargest(k, member_suitabilities.items(), key=lambda item: item[1])
+
+def pick_assignee(member_suitabilities, task_priority):
+    """Member for a task of task_priority: priority 1 goes to the best score, 2 to the second best, and so on."""
+    # Hanya perlu sebanyak task_priority anggota teratas
+    top_suitability_scores = rank_members(member_suitabilities, int(task_priority))
+    logger.debug("Top member suitability scores: %s", top_suitability_scores)
     
     # Ambil member yang memiliki skor tertinggi
-    best_suitable_member = list(sorted_suitability_scores.keys())[:int(task_priority)][-1]
-    print(f"Best suitable member: {best_suitable_member}")
+    best_suitable_member = top_suitability_scores[-1][0]
+    logger.debug("Best suitable member: %s", best_suitable_member)
     
     return best_suitable_member
+
+async def get_member_availability(member_ids, start=None, end=None):
+    """
+    Merged availability of every member in member_ids, complete at least within [start, end).
+    None leaves that side unbounded.
+    
+    The availability index only holds the rows around the assignment window, so a member's
+    refill reads a few weeks of rows and not their whole history. Ranges inside the window
+    are answered from the index, members are loaded into it on first use. Other ranges are
+    read from the availability table for that range only and not cached.
+    """
+    if not in_indexed_window(start, end):
+        req_availability = await fetch_rows_in(
+            "availability", "member_id, start_time, end_time", "member_id", member_ids,
+            where=lambda query: overlapping(query, start, end)
+        )
+        return group_availability(member_ids, req_availability)
+    
+    loaded = {}
+    missing = availability_index.missing(member_ids)
+    if missing:
+        load_start, load_end = indexed_window()
+        req_availability = await fetch_rows_in(
+            "availability", "member_id, start_time, end_time", "member_id", missing,
+            where=lambda query: overlapping(query, load_start, load_end)
+        )
+        loaded = availability_index.load(missing, req_availability)
+    return {
+        member_id: loaded.get(member_id) or availability_index.get(member_id) or MemberAvailability()
+        for member_id in member_ids
+    }
+
+def assignment_window():
+    """(start, end) timestamps of the assignment look-ahead window, None sides are unbounded."""
+    if ASSIGNMENT_WINDOW_DAYS > 0:
+        window_start = time.time()
+        return window_start, window_start + ASSIGNMENT_WINDOW_DAYS*24*3600
+    return None, None
+
+def indexed_window():
+    """
+    (start, end) timestamps of the availability loaded into the index: the assignment window
+    widened by the index ttl on both sides. An entry loaded now still holds the whole
+    assignment window of any moment before it goes stale.
+    """
+    window_start, window_end = assignment_window()
+    if window_start is None:
+        return None, None
+    return window_start - availability_index.ttl, window_end + availability_index.ttl
+
+def in_indexed_window(start, end):
+    """Whether every fresh index entry holds all availability within [start, end)."""
+    window_start, window_end = assignment_window()
+    if window_start is None:
+        return True
+    return start is not None and end is not None and start >= window_start - availability_index.ttl and end <= window_end
+
+def overlapping(query, start, end):
+    """Narrow an availability query to the rows overlapping [start, end), None sides are unbounded."""
+    # Sehari kelonggaran: backend lokal membandingkan waktu sebagai teks, offset zona waktu bisa menggeser urutannya
+    if start is not None:
+        query = query.gt("end_time", datetime.fromtimestamp(start - 24*3600, tz=timezone.utc).isoformat())
+    if end is not None:
+        query = query.lt("start_time", datetime.fromtimestamp(end + 24*3600, tz=timezone.utc).isoformat())
+    return query
+
+async def get_available_hours(member_ids):
+    """
+    Available hours of every member in member_ids within the assignment window, with
+    overlapping availability entries counted once.
+    """
+    window_start, window_end = assignment_window()
+    return {
+        member_id: member_availability.hours_between(window_start, window_end)
+        for member_id, member_availability in (await get_member_availability(member_ids, window_start, window_end)).items()
+    }
+
+async def get_scoring_workloads(member_ids):
+    """
+    The stored workload aggregates of member_ids, and a copy for scoring with the
+    available_hours of the assignment window from the availability index.
+    """
+    workloads, available_hours = await asyncio.gather(
+        get_member_workloads(member_ids),
+        get_available_hours(member_ids)
+    )
+    scoring_workloads = {
+        member_id: {**workloads[member_id], "available_hours": available_hours[member_id]}
+        for member_id in member_ids
+    }
+    return workloads, scoring_workloads
+
+async def determine_task_assignee(team_id, task_priority, team_members=None):
+    """
+    Pick the member of team_id that should get a task of task_priority.
+    
+    team_members can be passed when the caller already fetched the team's member ids.
+    """
+    if team_members is None:
+        team_members = await fetch_team_member_ids(team_id)
+    
+    # Ambil agregat workload seluruh anggota team sekaligus
+    _, scoring_workloads = await get_scoring_workloads(team_members)
+    
+    return pick_assignee(score_team_members(team_members, scoring_workloads), task_priority)
+
+def assign_tasks(tasks, team_members, workloads):
+    """
+    Assign tasks one by one in priority order (1 first), adding every pick to the member's
+    workload in memory so later tasks see it. Returns (task, assignee) pairs in assignment
+    order; workloads is updated in place.
+    """
+    member_suitabilities = score_team_members(team_members, workloads)
+    assignments = []
+    for task in sorted(tasks, key=lambda task: int(task["priority"])):
+        assignee = pick_assignee(member_suitabilities, task["priority"])
+        assignments.append((task, assignee))
+        
+        workloads[assignee] = {
+            **workloads[assignee],
+            "task_count": workloads[assignee]["task_count"] + 1,
+            "priority_sum": workloads[assignee]["priority_sum"] + int(task["priority"])
+        }
+        # Hanya skor anggota yang baru dapat task yang berubah
+        member_suitabilities.update(score_team_members([assignee], workloads))
+    return assignments
     
 
 # Endpoint: Membuat team baru
 @taskmanager_router.post("/create-team", summary="Create a new team")
-async def create_team(request: Request):
-    if supabase.validate_api_key(request):
+async def create_team(request: Request, identity: str = Depends(supabase.current_identity)):
+    if await supabase.validate_api_key(request):
         if "sandbox" in request.headers:
             new_team_details = await request.json()
             return {
@@ -104,30 +584,15 @@ async def create_team(request: Request):
                 }
             }
         else:
-            try:
-                access_token = request.cookies.get("access_token")
-                new_creator_id = supabase.client.auth.get_user(access_token).user.id
-            except Exception as e:
-                # Apabila service yang menembak API endpoint ini, bukan user dari webapp sendiri
-                print(e)
-                access_token = request.headers.get("API-Key")
-                new_creator_id = access_token
+            new_creator_id = identity
             
             new_team_details = await request.json()
             
             # Validate json body
             validate_request_json(new_team_details, "team_name")
             
-            # Membuat id team baru dengan metode auto increment
-            req_team_ids = supabase.client.table("teams").select("team_id").execute()
-            curr_team_ids = []
-            for team_id in req_team_ids.data:
-                curr_team_ids.append(team_id["team_id"])
-            try:
-                max_team_id = max(curr_team_ids)
-            except:
-                max_team_id = 0
-            new_team_id = str(int(max_team_id) + 1) # melakukan increment ke max team id
+            # Membuat id team baru dari sequence, tanpa membaca seluruh tabel teams
+            new_team_id = await team_id_allocator.allocate()
             
             new_created_at = datetime.now().isoformat()
 
@@ -138,8 +603,9 @@ async def create_team(request: Request):
                 creator_id=new_creator_id
             )
             
-            response = supabase.client.table("teams").insert(new_team_data.model_dump()).execute()
+            response = await supabase.run_query(supabase.client.table("teams").insert(new_team_data.model_dump()).execute)
             if response:
+                team_owner_cache.put(new_team_id, new_creator_id)
                 return {"message": "Team created successfully", "response": response}
             raise HTTPException(status_code=500, detail=response.model_dump_json())
     else:
@@ -147,7 +613,7 @@ async def create_team(request: Request):
 
 # Endpoint: Menambahkan anggota ke team
 @taskmanager_router.post("/add-team-member", summary="Add a new team member to a team")
-async def add_team_member(request: Request):
+async def add_team_member(request: Request, identity: str = Depends(supabase.current_identity)):
     new_member_details = await request.json()
     
     if "sandbox" in request.headers:
@@ -171,25 +637,11 @@ async def add_team_member(request: Request):
     validate_request_json(new_member_details, "team_id", "member_name")
     
     # Validate if current user is allowed to add to the team id
-    try:
-        creator_id = supabase.client.table("teams").select("creator_id").eq("team_id", new_task_details["team_id"]).execute().data[0]["creator_id"]
-        print(creator_id)
-        if current_user!= creator_id:
-            raise HTTPException(status_code=403, detail="You are not authorized to add team members to this team")
-    except:
-        raise HTTPException(status_code=404, detail="Team not found")
+    await check_team_owner(new_member_details["team_id"], identity, "You are not authorized to add team members to this team")
 
 
-    # Membuat id anggota team baru dengan metode auto increment
-    req_member_ids = supabase.client.table("team_members").select("member_id").execute()
-    curr_member_ids = []
-    for member_id in req_member_ids.data:
-        curr_member_ids.append(member_id["member_id"])
-    try:
-        max_member_id = max(curr_member_ids)
-    except:
-        max_member_id = 0
-    new_member_id = str(int(max_member_id) + 1) # melakukan increment ke max team id
+    # Membuat id anggota team baru dari sequence, tanpa membaca seluruh tabel team_members
+    new_member_id = await member_id_allocator.allocate()
     
     new_created_at = datetime.now().isoformat()
     try:
@@ -204,7 +656,7 @@ async def add_team_member(request: Request):
         created_at=new_created_at,
     )
     
-    response = supabase.client.table("team_members").insert(new_member_data.model_dump()).execute()
+    response = await supabase.run_query(supabase.client.table("team_members").insert(new_member_data.model_dump()).execute)
     if response:
         return {"message": "Team member added successfully", "response": response}
     raise HTTPException(status_code=500, detail=response.model_dump_json())
@@ -241,14 +693,15 @@ async def add_member_avail(request: Request):
         created_at = new_created_at
     )
     
-    response = supabase.client.table("availability").insert(new_avail_data.model_dump()).execute()
+    response = await supabase.run_query(supabase.client.table("availability").insert(new_avail_data.model_dump()).execute)
     if response:
+        availability_index.add(new_avail_data.member_id, new_avail_data.start_time, new_avail_data.end_time)
         return {"message": "Member availability added successfully", "response": response}
     raise HTTPException(status_code=500, detail=response.model_dump_json())
     
 # Endpoint: Menambahkan task milik team
 @taskmanager_router.post("/add-team-task", summary="Add a certain team's availability")
-async def add_team_task(request: Request):
+async def add_team_task(request: Request, identity: str = Depends(supabase.current_identity)):
     new_task_details = await request.json()
     
     if "sandbox" in request.headers:
@@ -271,25 +724,16 @@ async def add_team_task(request: Request):
     # Validate json body
     validate_request_json(new_task_details, "team_id", "task_name", "priority")
     
-    # Validate if current user is allowed to add to the team id
-    try:
-        access_token = request.cookies.get("access_token")
-        current_user = supabase.client.auth.get_user(access_token).user.id
-    except Exception as e:
-        print(e)
-        access_token = request.headers.get("API-Key")
-        current_user = access_token
-
-    try:
-        creator_id = supabase.client.table("teams").select("creator_id").eq("team_id", new_task_details["team_id"]).execute().data[0]["creator_id"]
-        print(creator_id)
-        if current_user!= creator_id:
-            raise HTTPException(status_code=403, detail="You are not authorized to add team tasks to this team")
-    except:
-        raise HTTPException(status_code=404, detail="Team not found")
+    # Validate if current user is allowed to add to the team id, fetching the team members alongside
+    _, team_members = await asyncio.gather(
+        check_team_owner(new_task_details["team_id"], identity, "You are not authorized to add team tasks to this team"),
+        fetch_team_member_ids(new_task_details["team_id"])
+    )
 
     new_created_at = datetime.now().isoformat()
-    new_task_assignee = determine_task_assignee(team_id=new_task_details["team_id"], task_priority=new_task_details["priority"])
+    new_task_assignee = await determine_task_assignee(
+        team_id=new_task_details["team_id"], task_priority=new_task_details["priority"], team_members=team_members
+    )
     print(new_task_assignee)
 
     new_task_data = Task(
@@ -300,32 +744,108 @@ async def add_team_task(request: Request):
         created_at = new_created_at
     )
     
-    response = supabase.client.table("task").insert(new_task_data.model_dump()).execute()
+    response = await supabase.run_query(supabase.client.table("task").insert(new_task_data.model_dump()).execute)
     if response:
+        await apply_workload_change(new_task_assignee, task_count=1, priority_sum=new_task_data.priority)
         return {"message": "Member task added successfully", "response": response}
     raise HTTPException(status_code=500, detail=response.model_dump_json())
     
+# Endpoint: Menambahkan banyak task milik team sekaligus
+@taskmanager_router.post("/add-team-tasks", summary="Add several tasks to a team at once")
+async def add_team_tasks(request: Request, identity: str = Depends(supabase.current_identity)):
+    new_tasks_details = await request.json()
+    
+    if "sandbox" in request.headers:
+        return {
+            "message": "Sandbox Team tasks added successfully",
+            "response": {
+                "data": [
+                    {
+                        "team_id": new_tasks_details["team_id"],
+                        "task_name": task["task_name"],
+                        "priority": task["priority"],
+                        "assigned_to": "1",  # Dummy assigned member ID
+                        "created_at": "2222-01-09T20:20:13.61856+00:00"
+                    }
+                    for task in new_tasks_details.get("tasks", [])
+                ],
+                "count": None
+            }
+        }
+    
+    # Validate json body
+    validate_request_json(new_tasks_details, "team_id", "tasks")
+    if not isinstance(new_tasks_details["tasks"], list) or len(new_tasks_details["tasks"]) == 0:
+        raise HTTPException(status_code=400, detail="tasks must be a non-empty list")
+    for task in new_tasks_details["tasks"]:
+        validate_request_json(task, "task_name", "priority")
+    
+    team_id = new_tasks_details["team_id"]
+    _, team_members = await asyncio.gather(
+        check_team_owner(team_id, identity, "You are not authorized to add team tasks to this team"),
+        fetch_team_member_ids(team_id)
+    )
+    
+    if len(team_members) == 0:
+        raise HTTPException(status_code=400, detail="Team has no members to assign tasks to")
+    
+    # Muat state team sekali, lalu assign semua task di memori
+    workloads, scoring_workloads = await get_scoring_workloads(team_members)
+    assignments = assign_tasks(new_tasks_details["tasks"], team_members, scoring_workloads)
+    
+    new_created_at = datetime.now().isoformat()
+    new_tasks_data = [
+        Task(
+            team_id = team_id,
+            task_name = task["task_name"],
+            priority = task["priority"],
+            assigned_to = assignee,
+            created_at = new_created_at
+        ).model_dump()
+        for task, assignee in assignments
+    ]
+    
+    response = await supabase.run_query(supabase.client.table("task").insert(new_tasks_data).execute)
+    if response:
+        # Simpan agregat workload hasil simulasi untuk anggota yang mendapat task
+        assignees = {assignee for _, assignee in assignments}
+        workload_rows = [
+            MemberWorkload(**{
+                **workloads[member_id],
+                "member_id": member_id,
+                "task_count": scoring_workloads[member_id]["task_count"],
+                "priority_sum": scoring_workloads[member_id]["priority_sum"],
+                "updated_at": new_created_at
+            }).model_dump()
+            for member_id in assignees
+        ]
+        await supabase.run_query(
+            supabase.client.table("member_workload").upsert(workload_rows, on_conflict="member_id").execute
+        )
+        return {"message": "Team tasks added successfully", "response": response}
+    raise HTTPException(status_code=500, detail=response.model_dump_json())
+    
 # Endpoint: Melihat team
 @taskmanager_router.get("/show-teams", summary="Shows team members of a certain team")
-async def show_teams(request: Request):
-    if supabase.validate_api_key(request):
+async def show_teams(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    identity: str = Depends(supabase.current_identity)
+):
+    if await supabase.validate_api_key(request):
         print(request.headers)
         if "sandbox" not in request.headers:
-            try:
-                access_token = request.cookies.get("access_token")
-                curr_user = supabase.client.auth.get_user(access_token).user.id
-            except Exception as e:
-                print(e)
-                access_token = request.headers.get("API-Key")
-                curr_user = access_token
+            curr_user = identity
             
-            response = supabase.client.table("teams")\
-                .select("team_id, team_name")\
-                .eq("creator_id", curr_user)\
-                .execute()
-            if response:
-                return {"message": f"Showing teams created by: {curr_user}", "data": response.data}
-            raise HTTPException(status_code=500, detail=response.model_dump_json())
+            return await list_response(
+                f"Showing teams created by: {curr_user}",
+                lambda: supabase.client.table("teams")
+                .select("team_id, team_name")
+                .eq("creator_id", curr_user),
+                ["team_id"], limit, cursor, stream
+            )
         else:
             return {
                 "message": "Showing teams created by: Sanbox",
@@ -349,7 +869,13 @@ async def show_teams(request: Request):
         
 # Endpoint: Melihat anggota team
 @taskmanager_router.get("/show-team-members", summary="Shows team members of a certain team")
-async def show_team_member(request: Request):
+async def show_team_member(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    identity: str = Depends(supabase.current_identity)
+):
     if "sandbox" in request.headers:
         return {
             "message": "Showing members from team id: 1",
@@ -370,31 +896,27 @@ async def show_team_member(request: Request):
                 }
             ]
         }
-    try:
-        access_token = request.cookies.get("access_token")
-        curr_user = supabase.client.auth.get_user(access_token).user.id
-    except Exception as e:
-        print(e)
-        access_token = request.headers.get("API-Key")
-        curr_user = access_token
-
     team_id = request.query_params.get("team_id")
 
-    team_creator = supabase.client.table("teams").select("creator_id").eq("team_id", team_id).data
-    if (team_creator != curr_user):
-        raise HTTPException(status_code=403, detail="You are not authorized to view team members")
-    
-    response = supabase.client.table("team_members")\
-        .select("member_name, role, teams(team_name)")\
-        .eq("team_id", team_id)\
-        .execute()
-    if response:
-        return {"message": f"Showing members from team id: {team_id}", "data": response.data}
-    raise HTTPException(status_code=500, detail=response.model_dump_json())
+    await check_team_owner(team_id, identity, "You are not authorized to view team members")
+
+    return await list_response(
+        f"Showing members from team id: {team_id}",
+        lambda: supabase.client.table("team_members")
+        .select("member_id, member_name, role, teams(team_name)")
+        .eq("team_id", team_id),
+        ["member_id"], limit, cursor, stream
+    )
     
 # Endpoint: Melihat task dari suatu team
 @taskmanager_router.get("/show-team-tasks", summary="Shows team tasks of a certain team")
-async def show_team_tasks(request: Request):
+async def show_team_tasks(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    identity: str = Depends(supabase.current_identity)
+):
     if "sandbox" in request.headers:
         return {
             "message": "Showing tasks from team id: 1",
@@ -414,27 +936,65 @@ async def show_team_tasks(request: Request):
             ]
         }
 
-    try:
-        access_token = request.cookies.get("access_token")
-        curr_user = supabase.client.auth.get_user(access_token).user.id
-    except Exception as e:
-        print(e)
-        access_token = request.headers.get("API-Key")
-        curr_user = access_token
-
     team_id = request.query_params.get("team_id")
+
+    await check_team_owner(team_id, identity, "You are not authorized to view team members")
+
+    # task_name bisa kembar, id memecah seri supaya paging tidak melewatkan baris
+    return await list_response(
+        f"Showing tasks from team id: {team_id}",
+        lambda: supabase.client.table("task")
+        .select(f"{ROW_ID_COLUMN}, task_name, priority")
+        .eq("team_id", team_id),
+        ["task_name", ROW_ID_COLUMN], limit, cursor, stream
+    )
+
+# Endpoint: Melihat peringkat kecocokan anggota team
+@taskmanager_router.get("/rank-team-members", summary="Shows the k most suitable members of a team for a new task")
+async def rank_team_members(team_id: str, request: Request, k: int = 5, identity: str = Depends(supabase.current_identity)):
+    if "sandbox" in request.headers:
+        return {
+            "message": "Showing top 2 members from team id: 1",
+            "data": [
+                {
+                    "member_id": "1",
+                    "suitability": 68.42,
+                    "available_hours": 16.0,
+                    "task_count": 2,
+                    "avg_priority": 3.5
+                },
+                {
+                    "member_id": "2",
+                    "suitability": 51.07,
+                    "available_hours": 8.0,
+                    "task_count": 3,
+                    "avg_priority": 2.0
+                }
+            ]
+        }
     
-    team_creator = supabase.client.table("teams").select("creator_id").eq("team_id", team_id).data
-    if (team_creator != curr_user):
-        raise HTTPException(status_code=403, detail="You are not authorized to view team members")
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
 
-    response = supabase.client.table("task")\
-        .select("task_name, priority")\
-        .eq("team_id", team_id)\
-        .execute()
-    if response:
-        return {"message": f"Showing tasks from team id: {team_id}", "data": response.data}
-    raise HTTPException(status_code=500, detail=response.model_dump_json())
+    _, team_members = await asyncio.gather(
+        check_team_owner(team_id, identity, "You are not authorized to view team members"),
+        fetch_team_member_ids(team_id)
+    )
+    
+    _, workloads = await get_scoring_workloads(team_members)
+    ranking = rank_members(score_team_members(team_members, workloads), k)
+    
+    data = []
+    for member_id, suitability in ranking:
+        available_hours, avg_priority = member_features(workloads[member_id])
+        data.append({
+            "member_id": member_id,
+            "suitability": suitability,
+            "available_hours": available_hours,
+            "task_count": workloads[member_id]["task_count"],
+            "avg_priority": avg_priority
+        })
+    return {"message": f"Showing top {len(data)} members from team id: {team_id}", "data": data}
 
 # Endpoint: Menghapus anggota dari tim
 @taskmanager_router.delete("/remove-team-member", summary="Remove a team member")
@@ -454,14 +1014,16 @@ async def remove_team_member(request: Request):
     team_id = request_data["team_id"]
     member_id = request_data["member_id"]
 
-    response = supabase.client.table("team_members").delete().eq("team_id", team_id).eq("member_id", member_id).execute()
+    response = await supabase.run_query(
+        supabase.client.table("team_members").delete().eq("team_id", team_id).eq("member_id", member_id).execute
+    )
     if response:
         return {"message": "Team member removed successfully", "response": response}
     raise HTTPException(status_code=500, detail=response.model_dump_json())
 
 # Endpoint: Melihat ketersediaan anggota
 @taskmanager_router.get("/view-availability", summary="View team members' availability")
-async def view_availability(team_id: str, request: Request):
+async def view_availability(team_id: str, request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, stream: bool = False):
     if "sandbox" in request.headers:
         return {
             "message": "Team members' availability",
@@ -481,10 +1043,80 @@ async def view_availability(team_id: str, request: Request):
             ]
         }
 
-    response = supabase.client.table("availability").select("*").eq("team_id", team_id).execute()
-    if response:
-        return {"message": "Team members' availability", "data": response.data}
-    raise HTTPException(status_code=500, detail=response.model_dump_json())
+    # Satu member bisa punya dua baris dengan start_time sama, id memecah seri
+    return await list_response(
+        "Team members' availability",
+        lambda: supabase.client.table("availability").select("*").eq("team_id", team_id),
+        ["member_id", "start_time", ROW_ID_COLUMN], limit, cursor, stream
+    )
+
+# Endpoint: Mencari waktu luang bersama anggota team
+@taskmanager_router.get("/team-common-slots", summary="Find time windows where enough members of a team are available")
+async def team_common_slots(
+    team_id: str,
+    request: Request,
+    min_members: Optional[int] = None,
+    member_ids: Optional[str] = None,
+    min_duration: int = 30,
+    from_time: Optional[str] = None,
+    to_time: Optional[str] = None,
+    identity: str = Depends(supabase.current_identity)
+):
+    if "sandbox" in request.headers:
+        return {
+            "message": "Common slots of team id: 1",
+            "data": [
+                {
+                    "start_time": "2222-01-09T10:00:00+00:00",
+                    "end_time": "2222-01-09T17:00:00+00:00",
+                    "duration_minutes": 420.0,
+                    "free_members": 2
+                }
+            ]
+        }
+    
+    _, team_members = await asyncio.gather(
+        check_team_owner(team_id, identity, "You are not authorized to view team members"),
+        fetch_team_member_ids(team_id)
+    )
+    
+    # Anggota tertentu harus luang semua, selain itu minimal min_members (default seluruh team)
+    if member_ids:
+        selected_members = list(dict.fromkeys(member_id.strip() for member_id in member_ids.split(",") if member_id.strip()))
+        unknown_members = [member_id for member_id in selected_members if member_id not in team_members]
+        if unknown_members:
+            raise HTTPException(status_code=400, detail=f"Members not in team {team_id}: {', '.join(unknown_members)}")
+        min_members = len(selected_members)
+    else:
+        selected_members = team_members
+        min_members = len(selected_members) if min_members is None else min_members
+    if min_members < 1 or min_members > len(selected_members):
+        raise HTTPException(status_code=400, detail=f"min_members must be between 1 and {len(selected_members)}")
+    if min_duration < 0:
+        raise HTTPException(status_code=400, detail="min_duration must not be negative")
+    
+    window_start, window_end = assignment_window()
+    try:
+        if from_time:
+            window_start = to_timestamp(from_time)
+        if to_time:
+            window_end = to_timestamp(to_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from_time and to_time must be ISO 8601 timestamps")
+    
+    member_availability = await get_member_availability(selected_members, window_start, window_end)
+    slots = common_slots(member_availability.values(), min_members, min_duration*60, window_start, window_end)
+    data = [
+        {
+            # Dalam UTC dengan offset, supaya tidak bergantung pada zona waktu server
+            "start_time": datetime.fromtimestamp(slot_start, tz=timezone.utc).isoformat(),
+            "end_time": datetime.fromtimestamp(slot_end, tz=timezone.utc).isoformat(),
+            "duration_minutes": (slot_end - slot_start)/60,
+            "free_members": free_members
+        }
+        for slot_start, slot_end, free_members in slots
+    ]
+    return {"message": f"Common slots of team id: {team_id}", "data": data}
 
 # Endpoint: Menghapus ketersediaan anggota
 @taskmanager_router.delete("/remove-availability", summary="Remove a team member's availability")
@@ -504,8 +1136,12 @@ async def remove_availability(request: Request):
     member_id = request_data["member_id"]
     start_time = request_data["start_time"]
 
-    response = supabase.client.table("availability").delete().eq("member_id", member_id).eq("start_time", start_time).execute()
+    response = await supabase.run_query(
+        supabase.client.table("availability").delete().eq("member_id", member_id).eq("start_time", start_time).execute
+    )
     if response:
+        for availability in response.data:
+            availability_index.remove(availability["member_id"], availability["start_time"], availability["end_time"])
         return {"message": "Availability removed successfully", "response": response}
     raise HTTPException(status_code=500, detail=response.model_dump_json())
 
@@ -527,7 +1163,162 @@ async def remove_task(request: Request):
     team_id = request_data["team_id"]
     task_name = request_data["task_name"]
 
-    response = supabase.client.table("task").delete().eq("team_id", team_id).eq("task_name", task_name).execute()
+    response = await supabase.run_query(
+        supabase.client.table("task").delete().eq("team_id", team_id).eq("task_name", task_name).execute
+    )
     if response:
+        # Berurutan, beberapa task bisa milik anggota yang sama
+        for task in response.data:
+            await apply_workload_change(task["assigned_to"], task_count=-1, priority_sum=-int(task["priority"]))
         return {"message": "Task removed successfully", "response": response}
-    raise HTTPException(status_code=500, detail=response.model_dump_json())
\ No newline at end of file
+    raise HTTPException(status_code=500, detail=response.model_dump_json())
+
+def is_capacity(value):
+    """Whether value is a valid task capacity: a JSON integer, not a boolean, of at least 0."""
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+# Endpoint: Menyeimbangkan ulang task dalam team
+@taskmanager_router.post("/rebalance-team", summary="Reassign a team's tasks to maximize total suitability, as a dry run unless told otherwise")
+async def rebalance_team(request: Request, identity: str = Depends(supabase.current_identity)):
+    if await supabase.validate_api_key(request):
+        request_data = await request.json()
+        validate_request_json(request_data, "team_id")
+        
+        if "sandbox" in request.headers:
+            return {
+                "message": "Sandbox Team rebalance planned",
+                "data": {
+                    "dry_run": True,
+                    "moves": [
+                        {
+                            "task_id": 2,
+                            "task_name": "Create Database",
+                            "priority": 2,
+                            "from": "1",
+                            "to": "2"
+                        }
+                    ],
+                    "suitability_before": 101.5,
+                    "suitability_after": 118.25
+                }
+            }
+        
+        team_id = request_data["team_id"]
+        dry_run = request_data.get("dry_run", True)
+        # Harus boolean, string "false" tidak boleh diam-diam dianggap dry run
+        if not isinstance(dry_run, bool):
+            raise HTTPException(status_code=400, detail="dry_run must be a boolean")
+        capacity = request_data.get("capacity")
+        member_capacities = request_data.get("capacities", {})
+        if capacity is not None and not is_capacity(capacity):
+            raise HTTPException(status_code=400, detail="capacity must be a non-negative integer")
+        if not isinstance(member_capacities, dict) or not all(is_capacity(value) for value in member_capacities.values()):
+            raise HTTPException(status_code=400, detail="capacities must map member ids to non-negative integers")
+        
+        _, team_members = await asyncio.gather(
+            check_team_owner(team_id, identity, "You are not authorized to rebalance this team"),
+            fetch_team_member_ids(team_id)
+        )
+        if len(team_members) == 0:
+            raise HTTPException(status_code=400, detail="Team has no members to assign tasks to")
+        
+        # Task dikenali lewat id, nama task bisa kembar
+        tasks = []
+        async for page in iterate_pages(
+            lambda: supabase.client.table("task").select(f"{ROW_ID_COLUMN}, task_name, priority, assigned_to").eq("team_id", team_id),
+            [ROW_ID_COLUMN]
+        ):
+            tasks.extend(page)
+        if len(tasks) == 0:
+            return {"message": "Team has no tasks to rebalance", "data": {"dry_run": dry_run, "moves": []}}
+        
+        # Kapasitas default membagi task serata mungkin, bisa diatur per anggota
+        if capacity is None:
+            capacity = math.ceil(len(tasks)/len(team_members))
+        capacities = [min(member_capacities.get(member_id, capacity), len(tasks)) for member_id in team_members]
+        if sum(capacities) < len(tasks):
+            raise HTTPException(status_code=400, detail=f"Capacities only allow {sum(capacities)} of {len(tasks)} tasks")
+        if len(tasks)*sum(capacities) > rebalance.REBALANCE_MAX_CELLS:
+            raise HTTPException(status_code=400, detail="Too many tasks and capacity slots to rebalance at once")
+        
+        # Beban dasar tiap anggota: agregat workload tanpa task yang akan diatur ulang
+        _, scoring_workloads = await get_scoring_workloads(team_members)
+        member_index = {member_id: index for index, member_id in enumerate(team_members)}
+        task_counts = [scoring_workloads[member_id]["task_count"] for member_id in team_members]
+        priority_sums = [scoring_workloads[member_id]["priority_sum"] for member_id in team_members]
+        for task in tasks:
+            if task["assigned_to"] in member_index:
+                index = member_index[task["assigned_to"]]
+                task_counts[index] = max(0, task_counts[index] - 1)
+                priority_sums[index] = max(0, priority_sums[index] - int(task["priority"]))
+        
+        try:
+            plan = await rebalance.run_plan(
+                [scoring_workloads[member_id]["available_hours"] for member_id in team_members],
+                task_counts,
+                priority_sums,
+                capacities,
+                [int(task["priority"]) for task in tasks],
+                [member_index.get(task["assigned_to"], -1) for task in tasks]
+            )
+        except BrokenProcessPool:
+            raise HTTPException(status_code=503, detail="Rebalance workers are unavailable, try again later")
+        
+        moves = [
+            {
+                "task_id": task[ROW_ID_COLUMN],
+                "task_name": task["task_name"],
+                "priority": task["priority"],
+                "from": task["assigned_to"],
+                "to": team_members[assignee]
+            }
+            for task, assignee in zip(tasks, plan["assignees"])
+            if task["assigned_to"] != team_members[assignee]
+        ]
+        
+        if not dry_run and moves:
+            await asyncio.gather(*[
+                supabase.run_query(
+                    supabase.client.table("task")
+                    .update({"assigned_to": move["to"]})
+                    .eq("team_id", team_id)
+                    .eq(ROW_ID_COLUMN, move["task_id"])
+                    .execute
+                )
+                for move in moves
+            ])
+            affected_members = {move["to"] for move in moves} | {move["from"] for move in moves if move["from"] in member_index}
+            await rebuild_member_workloads(list(affected_members))
+        
+        return {
+            "message": "Team rebalance planned" if dry_run else "Team rebalanced successfully",
+            "data": {
+                "dry_run": dry_run,
+                "moves": moves,
+                "suitability_before": plan["suitability_before"],
+                "suitability_after": plan["suitability_after"]
+            }
+        }
+    else:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+# Endpoint: Membangun ulang agregat workload anggota team
+@taskmanager_router.post("/rebuild-member-workload", summary="Recompute the workload aggregates of a team's members from their full history")
+async def rebuild_member_workload(request: Request, identity: str = Depends(supabase.current_identity)):
+    if await supabase.validate_api_key(request):
+        request_data = await request.json()
+        validate_request_json(request_data, "team_id")
+        
+        if "sandbox" in request.headers:
+            return {"message": "Sandbox Member workload rebuilt successfully", "data": []}
+        
+        team_id = request_data["team_id"]
+        _, member_ids = await asyncio.gather(
+            check_team_owner(team_id, identity, "You are not authorized to rebuild this team's workload"),
+            fetch_team_member_ids(team_id)
+        )
+        availability_index.invalidate(member_ids)
+        workloads = await rebuild_member_workloads(member_ids)
+        return {"message": "Member workload rebuilt successfully", "data": list(workloads.values())}
+    else:
+        raise HTTPException(status_code=401, detail="Invalid API key")
\ No newline at end of file
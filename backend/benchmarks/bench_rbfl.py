@@ -0,0 +1,275 @@
+"""
+Benchmarks for the fuzzy engine and the task assignment path.
+
+Everything runs on synthetic data against an in-memory Supabase stand-in, no network
+access or credentials are needed. Run from the backend directory:
+
+    python -m benchmarks.bench_rbfl --output bench.json
+    python -m benchmarks.bench_rbfl --quick --compare bench.json
+
+Results are written as JSON (one entry per case with its parameters and timings), and
+--compare prints the ratio against a previous results file to spot regressions.
+"""
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# The Supabase client is created on first use, these placeholders keep it offline
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark.placeholder")
+
+import app.services.rule_based_fuzzy_logic as rbfl
+import app.services.supabase as supabase
+import app.services.task_manager as task_manager
+from benchmarks.in_memory_supabase import InMemorySupabase
+
+SETS = ["low", "medium", "high"]
+
+def measure(function: Callable[[], Any], repeats: int, number: int = 1,
+            setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Time `number` calls of function, `repeats` times, and return per-call statistics in seconds."""
+    samples = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "repeats": repeats,
+        "number": number
+    }
+
+def synthetic_system(n_inputs: int, n_rules: int, resolution: int = rbfl.DEFAULT_RESOLUTION,
+                     defuzzify: str = "sample", inference: str = "mamdani", seed: int = 0) -> rbfl.FuzzySystem:
+    """System with n_inputs low/medium/high inputs on [0, 10] and n_rules random rules."""
+    rng = random.Random(seed)
+    system = rbfl.FuzzySystem(defuzzify=defuzzify, resolution=resolution, inference=inference)
+    for i in range(n_inputs):
+        system.add_input_variable(f"x{i}", 0, 10, {
+            "low": [0, 0, 2, 4],
+            "medium": [3, 4, 6, 7],
+            "high": [6, 8, 10, 10]
+        })
+    system.set_output_variable("y", 0, 100, {
+        "low": [0, 0, 20, 40],
+        "medium": [30, 40, 60, 70],
+        "high": [60, 80, 100, 100]
+    })
+    for _ in range(n_rules):
+        system.add_rule(
+            antecedents=[(f"x{i}", rng.choice(SETS)) for i in range(n_inputs)],
+            consequent=("y", rng.choice(SETS))
+        )
+    return system
+
+def bench_evaluate(repeats: int, quick: bool) -> List[Dict[str, Any]]:
+    """FuzzySystem.evaluate and evaluate_batch across rule counts, input counts and resolutions."""
+    rule_counts = [9, 100] if quick else [9, 50, 200, 500]
+    input_counts = [2, 4] if quick else [2, 4, 8]
+    resolutions = [100, 1000] if quick else [100, 1000, 10000]
+    batch_rows = 1000
+
+    # Vary one dimension at a time around the built-in shape (2 inputs, 9 rules, 1000 points)
+    cases = [{"n_inputs": 2, "n_rules": n, "resolution": 1000} for n in rule_counts]
+    cases += [{"n_inputs": k, "n_rules": 9, "resolution": 1000} for k in input_counts if k != 2]
+    cases += [{"n_inputs": 2, "n_rules": 9, "resolution": r} for r in resolutions if r != 1000]
+    cases += [
+        {"n_inputs": 2, "n_rules": 9, "resolution": 1000, "defuzzify": "exact"},
+        {"n_inputs": 2, "n_rules": 9, "resolution": 1000, "inference": "sugeno"}
+    ]
+
+    results = []
+    rng = np.random.default_rng(0)
+    for params in cases:
+        system = synthetic_system(**params)
+        rows = rng.uniform(0, 10, size=(batch_rows, params["n_inputs"]))
+        inputs = {f"x{i}": float(value) for i, value in enumerate(rows[0])}
+        system.evaluate(inputs)
+
+        results.append({
+            "name": "evaluate",
+            "params": params,
+            **measure(lambda: system.evaluate(inputs), repeats, number=20)
+        })
+        results.append({
+            "name": "evaluate_batch",
+            "params": {**params, "rows": batch_rows},
+            **measure(lambda: system.evaluate_batch(rows), repeats)
+        })
+    return results
+
+def bench_simple_fuzzy(repeats: int, quick: bool) -> List[Dict[str, Any]]:
+    """simple_fuzzy construction, on its own and including rule compilation."""
+    input_variables = [("workload", 0, 5), ("availability", 0, 24)]
+
+    def build_and_compile():
+        rbfl.simple_fuzzy(input_variables).compile()
+
+    return [
+        {
+            "name": "simple_fuzzy",
+            "params": {"compile": False},
+            **measure(lambda: rbfl.simple_fuzzy(input_variables), repeats, number=50)
+        },
+        {
+            "name": "simple_fuzzy",
+            "params": {"compile": True},
+            **measure(build_and_compile, repeats, number=50)
+        }
+    ]
+
+def seed_team(client: InMemorySupabase, team_size: int, availability_per_member: int = 3,
+              tasks_per_member: int = 2, seed: int = 0) -> str:
+    """Fill the stand-in with one team of team_size members, their availability and tasks."""
+    rng = random.Random(seed)
+    team_id = "1"
+    # Availability starts today so it falls inside the assignment window
+    start = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    client.table("teams").insert({
+        "team_id": team_id, "team_name": "benchmark", "created_at": start.isoformat(), "creator_id": "benchmark"
+    }).execute()
+
+    members, availability, tasks = [], [], []
+    for member in range(1, team_size + 1):
+        member_id = str(member)
+        members.append({
+            "member_id": member_id, "member_name": f"member {member}", "team_id": team_id,
+            "role": "", "created_at": start.isoformat()
+        })
+        for _ in range(availability_per_member):
+            begin = start + timedelta(days=rng.randrange(14), hours=rng.randrange(10))
+            availability.append({
+                "member_id": member_id,
+                "start_time": begin.isoformat(),
+                "end_time": (begin + timedelta(hours=rng.randrange(1, 9))).isoformat(),
+                "created_at": start.isoformat()
+            })
+        for task in range(tasks_per_member):
+            tasks.append({
+                "team_id": team_id, "task_name": f"task {member}-{task}", "priority": rng.randint(1, 5),
+                "assigned_to": member_id, "created_at": start.isoformat()
+            })
+    client.table("team_members").insert(members).execute()
+    client.table("availability").insert(availability).execute()
+    client.table("task").insert(tasks).execute()
+    return team_id
+
+def bench_determine_task_assignee(repeats: int, quick: bool) -> List[Dict[str, Any]]:
+    """determine_task_assignee on teams of 10 to 10,000 members against the stand-in."""
+    team_sizes = [10, 100, 1000] if quick else [10, 100, 1000, 10000]
+    results = []
+    original_client = supabase.client
+    try:
+        for team_size in team_sizes:
+            client = InMemorySupabase()
+            team_id = seed_team(client, team_size)
+            supabase.client = client
+            task_manager.availability_index.clear()
+
+            def clear_result_cache():
+                # Every repeat scores the team from scratch instead of hitting the memoized scores
+                system = rbfl.get_workload_availability_system()
+                if system.result_cache is not None:
+                    system.result_cache.clear()
+
+            def assign():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    asyncio.run(task_manager.determine_task_assignee(team_id=team_id, task_priority=3))
+
+            # The first assignment also builds the member workload aggregates and availability index
+            assign()
+            client.round_trips = 0
+            assign()
+            round_trips = client.round_trips
+            results.append({
+                "name": "determine_task_assignee",
+                "params": {"team_size": team_size},
+                "round_trips": round_trips,
+                **measure(assign, max(1, repeats if team_size <= 1000 else repeats // 2), setup=clear_result_cache)
+            })
+    finally:
+        supabase.client = original_client
+        task_manager.availability_index.clear()
+    return results
+
+def environment() -> Dict[str, Any]:
+    """Where the results come from, so files from different commits can be told apart."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform()
+    }
+
+def case_key(result: Dict[str, Any]) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """Print the median time of every case against the same case in a previous results file."""
+    with open(baseline_path) as baseline_file:
+        baseline = {case_key(result): result for result in json.load(baseline_file)["results"]}
+    print(f"{'case':<90} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for result in results:
+        previous = baseline.get(case_key(result))
+        if previous is None:
+            continue
+        ratio = result["median"] / previous["median"] if previous["median"] else float("inf")
+        print(f"{case_key(result):<90} {previous['median']:>12.6f} {result['median']:>12.6f} {ratio:>8.2f}")
+
+SUITES = {
+    "evaluate": bench_evaluate,
+    "simple_fuzzy": bench_simple_fuzzy,
+    "determine_task_assignee": bench_determine_task_assignee
+}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repeats per case")
+    parser.add_argument("--quick", action="store_true", help="Smaller parameter grids")
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append", help="Only run these suites")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.suite or SUITES:
+        print(f"Running {name} benchmarks", file=sys.stderr)
+        results.extend(SUITES[name](args.repeats, args.quick))
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
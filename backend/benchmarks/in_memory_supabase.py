@@ -0,0 +1,253 @@
+"""
+In-memory stand-in for the parts of the Supabase client used by the services, the
+storage interface described in app.services.storage.
+
+Only the PostgREST table API is covered: table(), select() (embedded resources through the
+primary keys in TABLES), insert(), upsert(), update(), delete(), eq(), gt(), lt(), in_(), or_() (eq/gt/lt terms and and() groups), order(), limit(), range()
+and execute(). Integer primary keys in TABLES (task.id, availability.id) are generated on
+insert like identity columns. Equality filters are answered from
+per-column hash indexes, so lookups stay cheap on tables with many rows, and every
+execute() is counted as one round trip.
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import time
+
+from app.services.storage import EMBEDDED, TABLES, Response, parse_logic, split_terms
+
+class Table:
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+        self._indexes: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {}
+        self.last_id = 0
+
+    def generate_ids(self, rows: List[Dict[str, Any]], key: str) -> None:
+        """Fill key of the rows that do not set it with the next identity values."""
+        for row in rows:
+            if row.get(key) is None:
+                self.last_id += 1
+                row[key] = self.last_id
+            else:
+                self.last_id = max(self.last_id, int(row[key]))
+
+    def index(self, column: str) -> Dict[Any, List[Dict[str, Any]]]:
+        """Hash index of the rows by column, built on first use."""
+        if column not in self._indexes:
+            index = defaultdict(list)
+            for row in self.rows:
+                index[_normalize(row.get(column))].append(row)
+            self._indexes[column] = index
+        return self._indexes[column]
+
+    def insert(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows.extend(rows)
+        for column, index in self._indexes.items():
+            for row in rows:
+                index[_normalize(row.get(column))].append(row)
+
+    def upsert(self, rows: List[Dict[str, Any]], key: str) -> None:
+        existing = self.index(key)
+        for row in rows:
+            matches = existing.get(_normalize(row.get(key)))
+            if matches:
+                matches[0].update(row)
+            else:
+                self.insert([row])
+        # Updated rows may have moved between index buckets of other columns
+        self._indexes = {key: self._indexes[key]}
+
+    def update(self, rows: List[Dict[str, Any]], values: Dict[str, Any]) -> None:
+        for row in rows:
+            row.update(values)
+        self._indexes.clear()
+
+    def delete(self, rows: List[Dict[str, Any]]) -> None:
+        doomed = {id(row) for row in rows}
+        self.rows = [row for row in self.rows if id(row) not in doomed]
+        self._indexes.clear()
+
+class QueryBuilder:
+    def __init__(self, client: "InMemorySupabase", table_name: str):
+        self._client = client
+        self._table_name = table_name
+        self._table = client.tables[table_name]
+        self._action = "select"
+        self._columns: Optional[List[str]] = None
+        self._embedded: Dict[str, Optional[List[str]]] = {}
+        self._payload: List[Dict[str, Any]] = []
+        self._filters: List[tuple] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "QueryBuilder":
+        self._action = "select"
+        if columns.strip() != "*":
+            self._columns = []
+            for column in map(str.strip, split_terms(columns)):
+                embedded = EMBEDDED.match(column)
+                if embedded is None:
+                    self._columns.append(column)
+                    continue
+                other_name, other_columns = embedded.groups()
+                if TABLES.get(other_name, {}).get("primary_key") is None:
+                    raise NotImplementedError(f"No many-to-one relation to {other_name}")
+                self._embedded[other_name] = None if other_columns.strip() == "*" else [
+                    other_column.strip() for other_column in other_columns.split(",")
+                ]
+        return self
+
+    def _embed(self, row: Dict[str, Any], other_name: str) -> Optional[Dict[str, Any]]:
+        """The row of other_name whose primary key matches row, restricted to the selected columns."""
+        key = TABLES[other_name]["primary_key"]
+        matches = self._client.tables[other_name].index(key).get(_normalize(row.get(key)))
+        if not matches:
+            return None
+        columns = self._embedded[other_name]
+        return dict(matches[0]) if columns is None else {column: matches[0].get(column) for column in columns}
+
+    def insert(self, rows) -> "QueryBuilder":
+        self._action = "insert"
+        self._payload = [dict(row) for row in (rows if isinstance(rows, list) else [rows])]
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id") -> "QueryBuilder":
+        self._action = "upsert"
+        self._payload = [dict(row) for row in (rows if isinstance(rows, list) else [rows])]
+        self._conflict_column = on_conflict
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "QueryBuilder":
+        self._action = "update"
+        self._payload = [dict(values)]
+        return self
+
+    def delete(self) -> "QueryBuilder":
+        self._action = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "QueryBuilder":
+        self._filters.append(("eq", column, value))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "QueryBuilder":
+        self._filters.append(("in", column, list(values)))
+        return self
+
+    def gt(self, column: str, value: Any) -> "QueryBuilder":
+        self._filters.append(("gt", column, value))
+        return self
+
+    def lt(self, column: str, value: Any) -> "QueryBuilder":
+        self._filters.append(("lt", column, value))
+        return self
+
+    def or_(self, filters: str) -> "QueryBuilder":
+        self._filters.append(("or", None, parse_logic(filters)))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "QueryBuilder":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> "QueryBuilder":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> "QueryBuilder":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self) -> Response:
+        self._client.round_trips += 1
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        
+        if self._action == "insert":
+            schema = TABLES.get(self._table_name)
+            if schema is not None and schema["primary_key"] and schema["columns"][schema["primary_key"]] == "INTEGER":
+                self._table.generate_ids(self._payload, schema["primary_key"])
+            self._table.insert(self._payload)
+            return Response([dict(row) for row in self._payload])
+        if self._action == "upsert":
+            self._table.upsert(self._payload, self._conflict_column)
+            return Response([dict(row) for row in self._payload])
+        
+        rows = self._matching_rows()
+        if self._action == "delete":
+            self._table.delete(rows)
+            return Response([dict(row) for row in rows])
+        if self._action == "update":
+            self._table.update(rows, self._payload[0])
+            return Response([dict(row) for row in rows])
+        
+        # Later order() calls break ties of earlier ones, so sort by them first
+        for column, desc in reversed(self._order):
+            rows = sorted(rows, key=lambda row: row.get(column), reverse=desc)
+        if self._limit is not None:
+            rows = rows[self._offset:self._offset + self._limit]
+        if self._columns is None:
+            return Response([dict(row) for row in rows])
+        return Response([
+            {
+                **{column: row.get(column) for column in self._columns},
+                **{other_name: self._embed(row, other_name) for other_name in self._embedded}
+            }
+            for row in rows
+        ])
+
+    def _matching_rows(self) -> List[Dict[str, Any]]:
+        if not self._filters:
+            return list(self._table.rows)
+        
+        # The first eq/in filter is answered from an index, the rest are checked row by row
+        indexed = next((f for f in self._filters if f[0] in ("eq", "in")), None)
+        if indexed is None:
+            rows = list(self._table.rows)
+        else:
+            operator, column, value = indexed
+            index = self._table.index(column)
+            if operator == "eq":
+                rows = list(index.get(_normalize(value), []))
+            else:
+                rows = [row for item in dict.fromkeys(map(_normalize, value)) for row in index.get(item, [])]
+        for condition in self._filters:
+            if condition is not indexed:
+                rows = [row for row in rows if _matches(row, condition)]
+        return rows
+
+def _matches(row: Dict[str, Any], condition: tuple) -> bool:
+    operator, column, value = condition
+    if operator == "or":
+        return any(_matches(row, term) for term in value)
+    if operator == "and":
+        return all(_matches(row, term) for term in value)
+    if operator == "in":
+        return _normalize(row.get(column)) in set(map(_normalize, value))
+    if operator in ("gt", "lt") and isinstance(row.get(column), (int, float)) and not isinstance(row.get(column), bool):
+        # Numeric columns compare as numbers, as in Postgres
+        return row[column] > float(value) if operator == "gt" else row[column] < float(value)
+    cell = _normalize(row.get(column))
+    if operator == "eq":
+        return cell == _normalize(value)
+    if cell is None:
+        return False
+    return cell > _normalize(value) if operator == "gt" else cell < _normalize(value)
+
+def _normalize(value: Any) -> Any:
+    """PostgREST coerces filter values to the column type, the stand-in compares ints as strings."""
+    return str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+class InMemorySupabase:
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds slept on every execute(), to model a network round trip
+        """
+        self.tables: Dict[str, Table] = defaultdict(Table)
+        self.latency = latency
+        self.round_trips = 0
+
+    def table(self, table_name: str) -> QueryBuilder:
+        return QueryBuilder(self, table_name)
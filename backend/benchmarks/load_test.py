@@ -0,0 +1,157 @@
+"""
+Load test of the API routes against a local storage backend.
+
+The app runs in-process behind httpx's ASGI transport on top of the SQLite storage backend
+(or the in-memory stand-in), seeded with one synthetic team, so no server, network access
+or Supabase project is needed. Every route is hit by --concurrency concurrent clients for
+--duration seconds. Run from the backend directory:
+
+    python -m benchmarks.load_test --output load.json
+    python -m benchmarks.load_test --backend memory --route /show-team-tasks --concurrency 50
+
+Prints throughput and p50/p99 latency per route, --output also writes them as JSON.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Set before the app is imported, the storage backend is read on first use
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark.placeholder")
+
+import httpx
+
+import app.services.supabase as supabase
+from app.main import app
+from benchmarks.bench_rbfl import environment, seed_team
+from benchmarks.in_memory_supabase import InMemorySupabase
+
+ORIGIN = "http://loadtest.local"
+API_KEY = "benchmark"
+
+# (method, path, query parameters, JSON body) of a request, built from the request number
+RequestFactory = Callable[[int], Tuple[str, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+
+ROUTES: Dict[str, RequestFactory] = {
+    "/show-teams": lambda n: ("GET", "/show-teams", None, None),
+    "/show-team-members": lambda n: ("GET", "/show-team-members", {"team_id": "1"}, None),
+    "/show-team-tasks": lambda n: ("GET", "/show-team-tasks", {"team_id": "1", "limit": 100}, None),
+    "/view-availability": lambda n: ("GET", "/view-availability", {"team_id": "1", "limit": 100}, None),
+    "/rank-team-members": lambda n: ("GET", "/rank-team-members", {"team_id": "1", "k": 5}, None),
+    "/team-common-slots": lambda n: ("GET", "/team-common-slots", {"team_id": "1", "min_members": 2}, None),
+    "/rbfl-evaluate": lambda n: ("GET", "/rbfl-evaluate", {"id": "benchmark", "variable1": n % 5, "variable2": n % 24}, None),
+    "/add-team-task": lambda n: ("POST", "/add-team-task", None, {"team_id": "1", "task_name": f"load {n}", "priority": n % 5 + 1})
+}
+
+def create_storage(backend: str, team_size: int):
+    """Fresh storage for the app, seeded with the benchmark API key, one team and one fuzzy system."""
+    if backend == "memory":
+        storage = InMemorySupabase()
+    else:
+        from app.services.storage import SQLiteStorage
+        storage = SQLiteStorage(os.environ["SQLITE_PATH"])
+    storage.table("API_KEYS").insert({"domain": ORIGIN, "key": API_KEY, "created_at": "2024-01-01T00:00:00"}).execute()
+    # The seeded team is created by "benchmark", which is also the caller's identity through the API key
+    seed_team(storage, team_size)
+    storage.table("rbfl_systems").insert({
+        "id": "benchmark", "creator_key": API_KEY,
+        "variable1_name": "workload", "variable1_min": 0, "variable1_max": 5,
+        "variable2_name": "availability", "variable2_min": 0, "variable2_max": 24,
+        "inference": "mamdani"
+    }).execute()
+    return storage
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    return float(np.percentile(samples, q)) if samples else None
+
+async def load_route(http: httpx.AsyncClient, build_request: RequestFactory, concurrency: int,
+                     duration: float) -> Dict[str, Any]:
+    """Send requests from concurrency workers for duration seconds and summarize their latencies."""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(sys.maxsize))
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            method, path, params, body = build_request(next(counter))
+            started = time.perf_counter()
+            response = await http.request(method, path, params=params, json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": float(np.mean(latencies)) if latencies else None
+    }
+
+async def run(routes: List[str], concurrency: int, duration: float) -> List[Dict[str, Any]]:
+    headers = {"Origin": ORIGIN, "API-Key": API_KEY}
+    # Unhandled errors in a route are counted as 500 responses instead of stopping the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", headers=headers, timeout=None) as http:
+        for route in routes:
+            print(f"Loading {route}", file=sys.stderr)
+            # Warm-up request so one-off work (caches, fuzzy system build) is not measured
+            method, path, params, body = ROUTES[route](-1)
+            await http.request(method, path, params=params, json=body)
+            results.append({
+                "route": route,
+                "params": {"concurrency": concurrency, "duration": duration},
+                **await load_route(http, ROUTES[route], concurrency, duration)
+            })
+    return results
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'route':<22} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for result in results:
+        p50 = result["p50"] * 1000 if result["p50"] is not None else float("nan")
+        p99 = result["p99"] * 1000 if result["p99"] is not None else float("nan")
+        print(f"{result['route']:<22} {result['requests']:>9} {result['errors']:>7} "
+              f"{result['throughput']:>9.1f} {p50:>9.2f} {p99:>9.2f}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite", help="Storage behind the app")
+    parser.add_argument("--team-size", type=int, default=100, help="Members of the seeded team")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients per route")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per route")
+    parser.add_argument("--route", choices=sorted(ROUTES), action="append", help="Only load these routes")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    supabase.client = create_storage(args.backend, args.team_size)
+    # The routes print their intermediate results, keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run(args.route or list(ROUTES), args.concurrency, args.duration))
+
+    print_table(results)
+    if args.output:
+        report = {
+            "environment": {**environment(), "backend": args.backend, "team_size": args.team_size},
+            "results": results
+        }
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+
+# Placeholders keep the Supabase client offline, every test swaps in a local backend
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test.placeholder")
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.services.supabase as supabase
+import app.services.task_manager as task_manager
+from app.main import app
+from app.services.storage import SQLiteStorage
+from benchmarks.in_memory_supabase import InMemorySupabase
+
+HEADERS = {"Origin": "http://test.local", "API-Key": "test-key"}
+TASK_NAMES = ["alpha", "dup", "dup", "beta", "dup", "gamma", "delta", "epsilon", "zeta"]
+
+@pytest.fixture(params=["sqlite", "memory"])
+def client(request, monkeypatch):
+    storage = SQLiteStorage() if request.param == "sqlite" else InMemorySupabase()
+    monkeypatch.setattr(supabase, "client", storage, raising=False)
+    supabase.api_key_cache.invalidate()
+    task_manager.team_owner_cache.entries.clear()
+    task_manager.availability_index.clear()
+
+    storage.table("API_KEYS").insert({"domain": HEADERS["Origin"], "key": HEADERS["API-Key"]}).execute()
+    storage.table("teams").insert({
+        "team_id": "1", "team_name": "test", "created_at": "2024-01-01T00:00:00", "creator_id": HEADERS["API-Key"]
+    }).execute()
+    storage.table("team_members").insert([
+        {"member_id": member_id, "member_name": f"member {member_id}", "team_id": "1", "role": "member"}
+        for member_id in ["1", "2"]
+    ]).execute()
+    storage.table("task").insert([
+        {"team_id": "1", "task_name": name, "priority": 3, "assigned_to": "1", "created_at": "2024-01-01T00:00:00"}
+        for name in TASK_NAMES
+    ]).execute()
+    # Two rows of member 1 share a start_time
+    storage.table("availability").insert([
+        {"member_id": member_id, "team_id": "1", "start_time": start_time, "end_time": "2024-01-02T17:00:00", "created_at": "2024-01-01T00:00:00"}
+        for member_id, start_time in [
+            ("1", "2024-01-02T09:00:00"), ("1", "2024-01-02T09:00:00"), ("1", "2024-01-02T10:00:00"),
+            ("2", "2024-01-02T09:00:00"), ("2", "2024-01-02T09:00:00")
+        ]
+    ]).execute()
+    return TestClient(app)
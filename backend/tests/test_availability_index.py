@@ -0,0 +1,120 @@
+from datetime import datetime, timezone
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+import app.services.supabase as supabase
+import app.services.task_manager as task_manager
+from app.services.availability_index import MemberAvailability, common_slots, to_timestamp
+from tests.conftest import HEADERS
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+def random_intervals(rng, count):
+    """count (start, end) pairs on a 0..100 grid, overlapping and touching each other."""
+    starts = rng.integers(0, 90, count)
+    return [(int(start), int(start + length)) for start, length in zip(starts, rng.integers(1, 15, count))]
+
+def covered(intervals):
+    """Grid units covered by any of intervals, the brute force reference."""
+    return {unit for start, end in intervals for unit in range(start, end)}
+
+@pytest.fixture(params=["UTC", "Asia/Jakarta", "America/New_York"])
+def server_timezone(request, monkeypatch):
+    monkeypatch.setenv("TZ", request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+def test_naive_times_are_read_as_utc(server_timezone):
+    assert to_timestamp("2024-01-02T10:00:00") == 1704189600
+    assert to_timestamp("2024-01-02T10:00:00+00:00") == 1704189600
+    assert to_timestamp("2024-01-02T17:00:00+07:00") == 1704189600
+
+def test_common_slots_do_not_depend_on_server_timezone(client, server_timezone):
+    response = client.get("/team-common-slots", headers=HEADERS, params={
+        "team_id": "1", "min_members": 2, "from_time": "2024-01-02T00:00:00", "to_time": "2024-01-03T00:00:00"
+    })
+
+    assert response.status_code == 200
+    assert response.json()["data"] == [{
+        "start_time": "2024-01-02T09:00:00+00:00",
+        "end_time": "2024-01-02T17:00:00+00:00",
+        "duration_minutes": 480.0,
+        "free_members": 2
+    }]
+
+def test_index_only_loads_the_assignment_window(client):
+    now = time.time()
+    supabase.client.table("availability").insert([
+        {"member_id": "1", "team_id": "1", "start_time": iso(now + 3600), "end_time": iso(now + 3*3600)},
+        {"member_id": "1", "team_id": "1", "start_time": iso(now - 90*24*3600), "end_time": iso(now - 89*24*3600)}
+    ]).execute()
+
+    hours = asyncio.run(task_manager.get_available_hours(["1", "2"]))
+    indexed = task_manager.availability_index.get("1")
+
+    assert hours == {"1": pytest.approx(2), "2": 0}
+    # The 2024 rows of the fixture and the row of 90 days ago are not read into the index
+    assert indexed.intervals_between() == [(pytest.approx(now + 3600), pytest.approx(now + 3*3600))]
+
+def test_ranges_outside_the_window_are_read_from_the_table(client):
+    task_manager.availability_index.load(["1", "2"], [])
+    start, end = to_timestamp("2024-01-02T00:00:00"), to_timestamp("2024-01-03T00:00:00")
+
+    availability = asyncio.run(task_manager.get_member_availability(["1", "2"], start, end))
+
+    assert availability["1"].hours_between(start, end) == 8
+    assert availability["2"].hours_between(start, end) == 8
+    assert task_manager.availability_index.get("1").intervals_between() == []
+
+def test_member_availability_merges_added_intervals():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        intervals = random_intervals(rng, 12)
+        availability = MemberAvailability(intervals[:6])
+        for start, end in intervals[6:]:
+            availability.add(start, end)
+
+        assert covered(availability.intervals_between()) == covered(intervals)
+        assert all(end < next_start for (_, end), (next_start, _) in zip(availability.intervals_between(), availability.intervals_between()[1:]))
+        assert availability.hours_between()*3600 == pytest.approx(len(covered(intervals)))
+        assert availability.hours_between(20, 60)*3600 == pytest.approx(len(covered(intervals) & set(range(20, 60))))
+
+def test_member_availability_removes_one_entry_of_overlapping_ones():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        intervals = random_intervals(rng, 10)
+        availability = MemberAvailability(intervals)
+        removed = intervals[rng.integers(0, len(intervals))]
+
+        assert availability.remove(*removed)
+        intervals.remove(removed)
+        assert covered(availability.intervals_between()) == covered(intervals)
+
+    assert not MemberAvailability([(0, 10)]).remove(0, 5)
+
+def test_common_slots_match_a_brute_force_count():
+    rng = np.random.default_rng(2)
+    for _ in range(50):
+        members = [random_intervals(rng, 4) for _ in range(4)]
+        min_members = int(rng.integers(1, 5))
+        free = [sum(unit in covered(intervals) for intervals in members) for unit in range(110)]
+
+        slots = common_slots([MemberAvailability(intervals) for intervals in members], min_members)
+
+        assert covered((start, end) for start, end, _ in slots) == {unit for unit in range(110) if free[unit] >= min_members}
+        for start, end, most_free in slots:
+            assert most_free == max(free[start:end])
+
+def test_common_slots_honour_min_duration_and_bounds():
+    members = [MemberAvailability([(0, 10), (20, 60)]), MemberAvailability([(5, 30), (40, 100)])]
+
+    assert common_slots(members, 2) == [(5, 10, 2), (20, 30, 2), (40, 60, 2)]
+    assert common_slots(members, 2, min_duration=15) == [(40, 60, 2)]
+    assert common_slots(members, 2, start=8, end=50) == [(8, 10, 2), (20, 30, 2), (40, 50, 2)]
+    assert common_slots(members, 1) == [(0, 100, 2)]
@@ -0,0 +1,14 @@
+import app.services.supabase as supabase
+from tests.conftest import HEADERS
+
+OTHER_HEADERS = {"Origin": "http://other.local", "API-Key": "other-key"}
+
+def test_rebuild_member_workload_is_owner_only(client):
+    supabase.client.table("API_KEYS").insert({"domain": OTHER_HEADERS["Origin"], "key": OTHER_HEADERS["API-Key"]}).execute()
+
+    assert client.post("/rebuild-member-workload", headers=OTHER_HEADERS, json={"team_id": "1"}).status_code == 403
+    assert client.post("/rebuild-member-workload", headers=HEADERS, json={"team_id": "404"}).status_code == 404
+
+    response = client.post("/rebuild-member-workload", headers=HEADERS, json={"team_id": "1"})
+    assert response.status_code == 200
+    assert {workload["member_id"]: workload["task_count"] for workload in response.json()["data"]} == {"1": 9, "2": 0}
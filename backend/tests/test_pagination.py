@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+import app.services.supabase as supabase
+import app.services.task_manager as task_manager
+from tests.conftest import HEADERS, TASK_NAMES
+
+def collect_pages(client, path, params, limit):
+    rows, cursor = [], None
+    while True:
+        page = client.get(path, headers=HEADERS, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert page.status_code == 200
+        rows += page.json()["data"]
+        cursor = page.json()["next_cursor"]
+        if cursor is None:
+            return rows
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4])
+def test_task_pages_keep_duplicate_names(client, limit):
+    unpaged = client.get("/show-team-tasks", headers=HEADERS, params={"team_id": "1"}).json()["data"]
+    paged = collect_pages(client, "/show-team-tasks", {"team_id": "1"}, limit)
+
+    assert len(unpaged) == len(TASK_NAMES)
+    assert paged == unpaged
+    assert sorted(task["task_name"] for task in paged) == sorted(TASK_NAMES)
+
+@pytest.mark.parametrize("limit", [1, 2])
+def test_availability_pages_keep_duplicate_start_times(client, limit):
+    unpaged = client.get("/view-availability", headers=HEADERS, params={"team_id": "1"}).json()["data"]
+    paged = collect_pages(client, "/view-availability", {"team_id": "1"}, limit)
+
+    assert len(unpaged) == 5
+    assert paged == unpaged
+
+def test_internal_pages_keep_duplicate_names(client):
+    async def all_rows():
+        rows = []
+        async for page in task_manager.iterate_pages(
+            lambda: supabase.client.table("task").select("id, task_name").eq("team_id", "1"),
+            ["task_name", task_manager.ROW_ID_COLUMN], page_size=2
+        ):
+            rows += page
+        return rows
+
+    assert sorted(row["task_name"] for row in asyncio.run(all_rows())) == sorted(TASK_NAMES)
+
+def test_bulk_fetch_pages_keep_rows_of_the_same_member(client):
+    # Enough rows of few members that every page boundary falls inside one member's rows
+    rows = [
+        {"member_id": f"bulk-{member}", "team_id": "2", "start_time": "2024-02-01T09:00:00", "end_time": "2024-02-01T10:00:00"}
+        for member in range(3) for _ in range(task_manager.BULK_PAGE_SIZE)
+    ]
+    supabase.client.table("availability").insert(rows).execute()
+
+    fetched = asyncio.run(task_manager.fetch_rows_in("availability", "member_id, start_time", "member_id", ["bulk-0", "bulk-1", "bulk-2"]))
+
+    assert len(fetched) == len(rows)
+    assert len({row["id"] for row in fetched}) == len(rows)
@@ -0,0 +1,73 @@
+from itertools import permutations
+import asyncio
+import os
+import signal
+
+import numpy as np
+import pytest
+
+import app.services.rebalance as rebalance
+from tests.conftest import HEADERS
+
+# Two members, three tasks of priority 3 all held by the first one
+PLAN_ARGS = ([10.0, 5.0], [0, 0], [0, 0], [2, 2], [3, 3, 3], [0, 0, 0])
+
+@pytest.fixture(autouse=True)
+def stop_pool():
+    # The app lifespan is not run by these tests, stop the workers it would stop
+    yield
+    rebalance.shutdown_pool()
+
+@pytest.mark.parametrize("body", [
+    {"dry_run": "false"},
+    {"dry_run": 1},
+    {"capacity": -1},
+    {"capacity": "2"},
+    {"capacities": {"1": -1, "2": 20}},
+    {"capacities": {"1": "many"}},
+    {"capacities": {"1": 2.5}},
+    {"capacities": [5, 5]}
+])
+def test_rebalance_rejects_invalid_options(client, body):
+    response = client.post("/rebalance-team", headers=HEADERS, json={"team_id": "1", **body})
+
+    assert response.status_code == 400
+
+def test_rebalance_dry_run_does_not_move_tasks(client):
+    tasks = client.get("/show-team-tasks", headers=HEADERS, params={"team_id": "1"}).json()["data"]
+    response = client.post("/rebalance-team", headers=HEADERS, json={"team_id": "1", "capacities": {"1": 0, "2": 9}})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["dry_run"] is True
+    assert {move["to"] for move in response.json()["data"]["moves"]} == {"2"}
+    assert client.get("/show-team-tasks", headers=HEADERS, params={"team_id": "1"}).json()["data"] == tasks
+
+def test_run_plan_replaces_a_broken_pool():
+    async def plan_after_worker_crash():
+        await rebalance.run_plan(*PLAN_ARGS)
+        pool = rebalance.get_pool()
+        for pid in list(pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        return pool, await rebalance.run_plan(*PLAN_ARGS), await rebalance.run_plan(*PLAN_ARGS)
+
+    broken_pool, first, second = asyncio.run(plan_after_worker_crash())
+
+    assert rebalance.get_pool() is not broken_pool
+    assert sorted(first["assignees"]) == sorted(second["assignees"]) == [0, 1, 1]
+
+@pytest.mark.parametrize("shape", [(1, 1), (3, 3), (4, 6), (5, 5), (6, 7)])
+def test_min_cost_assignment_matches_brute_force(shape):
+    rng = np.random.default_rng(shape[0]*10 + shape[1])
+    for _ in range(20):
+        # Few distinct values so ties are common
+        cost = rng.integers(0, 5, shape).astype(float)
+
+        assignment = rebalance.min_cost_assignment(cost)
+        best = min(sum(cost[row, column] for row, column in enumerate(columns)) for columns in permutations(range(shape[1]), shape[0]))
+
+        assert len(set(assignment.tolist())) == shape[0]
+        assert cost[np.arange(shape[0]), assignment].sum() == best
+
+def test_min_cost_assignment_needs_enough_columns():
+    with pytest.raises(ValueError):
+        rebalance.min_cost_assignment(np.zeros((3, 2)))
@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+
+import app.services.rule_based_fuzzy_logic as rbfl
+from tests.conftest import HEADERS
+
+INPUT_VARIABLES = [("workload", 0, 5), ("availability", 0, 24)]
+
+def random_inputs(count, seed=0):
+    """count (workload, availability) rows spread over the input ranges."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(0, 5, count), rng.uniform(0, 24, count)])
+
+@pytest.mark.parametrize("create", [
+    rbfl.create_workload_availability_system,
+    lambda **options: rbfl.simple_fuzzy(INPUT_VARIABLES, **options)
+])
+def test_exact_centroid_matches_a_dense_reference(create):
+    inputs = random_inputs(300)
+
+    exact = create(defuzzify="exact").evaluate_batch(inputs)
+    dense = create(resolution=200001).evaluate_batch(inputs)
+
+    assert np.abs(exact - dense).max() < 1e-3
+
+def build_counter():
+    """A builder of simple systems and the list of systems it built."""
+    built = []
+    def builder():
+        built.append(rbfl.simple_fuzzy(INPUT_VARIABLES))
+        return built[-1]
+    return builder, built
+
+def test_registry_evicts_least_recently_used():
+    registry = rbfl.SystemRegistry(max_size=2)
+    builder, built = build_counter()
+
+    registry.get_or_build("a", {}, builder)
+    registry.get_or_build("b", {}, builder)
+    registry.get_or_build("a", {}, builder)
+    registry.get_or_build("c", {}, builder)
+    registry.get_or_build("a", {}, builder)
+    registry.get_or_build("b", {}, builder)
+
+    assert len(built) == 4
+    assert registry.stats()["evictions"] == 2
+    assert (registry.stats()["hits"], registry.stats()["misses"]) == (2, 4)
+
+def test_registry_expires_unpinned_systems():
+    registry = rbfl.SystemRegistry(ttl=0)
+    builder, built = build_counter()
+
+    for _ in range(2):
+        registry.get_or_build("expiring", {}, builder)
+        registry.get_or_build("pinned", {}, builder, pinned=True)
+
+    # Both expiring systems are built, and dropped as soon as they are stored
+    assert len(built) == 3
+    assert registry.stats()["size"] == 1
+
+def test_registry_drops_systems_of_a_changed_definition():
+    registry = rbfl.SystemRegistry()
+    builder, built = build_counter()
+
+    old = registry.get_or_build("rbfl", {"version": 1}, builder)
+    old.enable_result_cache().put((1.0, 1.0), 50.0)
+    registry.get_or_build("rbfl", {"version": 2}, builder)
+
+    assert registry.stats()["size"] == 1
+    assert registry.stats()["invalidations"] == 1
+    assert old.result_cache.get((1.0, 1.0)) is None
+    assert registry.invalidate("rbfl") == 1
+    assert registry.stats()["size"] == 0
+
+def test_registry_stats_include_result_caches(client, monkeypatch):
+    monkeypatch.setattr(rbfl, "registry", rbfl.SystemRegistry())
+    system = rbfl.get_simple_fuzzy_system("stats", INPUT_VARIABLES)
+    for _ in range(3):
+        system.evaluate({"workload": 1, "availability": 8})
+
+    response = client.get("/rbfl-registry-stats", headers=HEADERS)
+
+    assert response.status_code == 200
+    assert response.json()["data"]["misses"] == 1
+    assert response.json()["data"]["result_cache"] == {
+        "systems": 1, "size": 1, "hits": 2, "misses": 1, "invalidations": 0, "hit_rate": 2/3
+    }
+
+def test_surface_stays_within_its_error_bound():
+    surface = rbfl.simple_fuzzy(INPUT_VARIABLES, surface_grid=101)
+    engine = rbfl.simple_fuzzy(INPUT_VARIABLES)
+    inputs = random_inputs(2000, seed=1)
+
+    error = np.abs(surface.evaluate_batch(inputs) - engine.evaluate_batch(inputs)).max()
+
+    assert 0 < surface.surface_error < 5
+    assert error <= surface.surface_error
+    # Grid nodes are exact
+    assert surface.evaluate({"workload": 2.5, "availability": 12}) == pytest.approx(engine.evaluate({"workload": 2.5, "availability": 12}))
+
+def test_surface_leaves_out_of_range_inputs_to_the_engine():
+    surface = rbfl.simple_fuzzy(INPUT_VARIABLES, surface_grid=11)
+    engine = rbfl.simple_fuzzy(INPUT_VARIABLES)
+    inputs = np.array([[-1.0, 12.0], [2.0, 30.0]])
+
+    assert surface.evaluate_batch(inputs).tolist() == engine.evaluate_batch(inputs).tolist()
+
+    surface.add_rule([("workload", "low")], ("suitability", "high"))
+    assert surface._surface is None
+
+def test_result_cache_hits_on_quantized_inputs():
+    system = rbfl.simple_fuzzy(INPUT_VARIABLES)
+    cache = system.enable_result_cache(precision=2)
+
+    first = system.evaluate({"workload": 1.234, "availability": 8})
+    second = system.evaluate({"workload": 1.2344, "availability": 8.001})
+    batch = system.evaluate_batch(np.array([[1.234, 8.0], [3.0, 20.0]]))
+
+    assert first == second == batch[0]
+    assert batch[1] == rbfl.simple_fuzzy(INPUT_VARIABLES).evaluate({"workload": 3, "availability": 20})
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["size"] == 2
+
+def test_result_cache_is_invalidated_by_definition_changes():
+    system = rbfl.simple_fuzzy(INPUT_VARIABLES)
+    cache = system.enable_result_cache()
+    before = system.evaluate({"workload": 0, "availability": 0})
+
+    system.add_rule([("workload", "low"), ("availability", "low")], ("suitability", "high"))
+    after = system.evaluate({"workload": 0, "availability": 0})
+
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["hits"] == 0
+    assert after > before
+
+def test_result_cache_evicts_least_recently_used():
+    cache = rbfl.ResultCache(max_size=2)
+    cache.put((1.0,), 10.0)
+    cache.put((2.0,), 20.0)
+    cache.get((1.0,))
+    cache.put((3.0,), 30.0)
+
+    assert cache.get((2.0,)) is None
+    assert cache.get((1.0,)) == 10.0
+    assert cache.get((3.0,)) == 30.0
+
+def test_sugeno_averages_the_consequent_centroids():
+    system = rbfl.simple_fuzzy(INPUT_VARIABLES, inference="sugeno")
+    # Centroids of the low, medium and high suitability trapezoids
+    low, medium, high = 140/9, 50.0, 760/9
+
+    assert system.evaluate({"workload": 0, "availability": 24}) == pytest.approx(high)
+    assert system.evaluate({"workload": 5, "availability": 0}) == pytest.approx(low)
+    # Workload 1.75 is low at 0.25 and medium at 0.5, with high availability both rules conclude high
+    assert system.evaluate({"workload": 1.75, "availability": 24}) == pytest.approx(high)
+    # Availability 8.4 is low at 0.25 and medium at 0.5, high workload then concludes low and medium
+    assert system.evaluate({"workload": 5, "availability": 8.4}) == pytest.approx((0.25*low + 0.5*medium)/0.75)
+
+def test_sugeno_batch_matches_single_evaluations():
+    system = rbfl.simple_fuzzy(INPUT_VARIABLES, inference="sugeno")
+    inputs = random_inputs(50)
+
+    assert system.evaluate_batch(inputs) == pytest.approx([
+        system.evaluate({"workload": workload, "availability": availability}) for workload, availability in inputs
+    ])
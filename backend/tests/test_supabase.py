@@ -0,0 +1,61 @@
+import pytest
+
+import app.services.supabase as supabase
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen time.monotonic and time.time, advanced by assigning clock.now."""
+    class Clock:
+        now = 1000.0
+    monkeypatch.setattr(supabase.time, "monotonic", lambda: Clock.now)
+    monkeypatch.setattr(supabase.time, "time", lambda: Clock.now)
+    return Clock
+
+def test_api_key_cache_expires_entries(clock):
+    cache = supabase.ApiKeyCache(ttl=60, negative_ttl=10)
+    cache.put("http://known.local", "key")
+    cache.put("http://unknown.local", None)
+
+    clock.now += 9
+    assert cache.get("http://known.local") == (True, "key")
+    assert cache.get("http://unknown.local") == (True, None)
+
+    clock.now += 2
+    assert cache.get("http://known.local") == (True, "key")
+    assert cache.get("http://unknown.local") == (False, None)
+
+    clock.now += 50
+    assert cache.get("http://known.local") == (False, None)
+    assert (cache.hits, cache.negative_hits, cache.misses) == (2, 1, 2)
+
+def test_api_key_cache_is_bounded_and_invalidated(clock):
+    cache = supabase.ApiKeyCache(max_size=2)
+    for domain in ["a", "b", "c"]:
+        cache.put(domain, f"key-{domain}")
+
+    assert cache.get("a") == (False, None)
+    cache.invalidate("b")
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, "key-c")
+
+def test_identity_cache_keeps_tokens_until_they_expire(clock):
+    cache = supabase.IdentityCache(max_size=2)
+    cache.put("token", "user", expires_at=clock.now + 30)
+
+    clock.now += 29
+    assert cache.get("token") == "user"
+
+    clock.now += 1
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+def test_identity_cache_drops_least_recently_used_tokens(clock):
+    cache = supabase.IdentityCache(max_size=2)
+    cache.put("first", "user-1", expires_at=clock.now + 60)
+    cache.put("second", "user-2", expires_at=clock.now + 60)
+    cache.get("first")
+    cache.put("third", "user-3", expires_at=clock.now + 60)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == "user-1"
+    assert cache.get("third") == "user-3"
@@ -0,0 +1,31 @@
+import asyncio
+
+import app.services.supabase as supabase
+import app.services.task_manager as task_manager
+
+def test_id_allocators_never_share_an_id(client):
+    # One allocator per process, all reserving small blocks from the same sequence row
+    allocators = [task_manager.IdAllocator("teams", "team_id", block_size=3) for _ in range(8)]
+
+    async def allocate_all():
+        return await asyncio.gather(*[allocator.allocate() for allocator in allocators for _ in range(10)])
+
+    ids = asyncio.run(allocate_all())
+    sequence = supabase.client.table("id_sequences").select("last_value").eq("name", "teams").execute().data
+
+    assert len(set(ids)) == len(ids) == 80
+    # The fixture's team 1 is skipped
+    assert min(int(new_id) for new_id in ids) == 2
+    assert int(sequence[0]["last_value"]) >= max(int(new_id) for new_id in ids)
+
+def test_rank_members_keeps_the_order_of_ties():
+    suitabilities = {"a": 50.0, "b": 70.0, "c": 50.0, "d": 70.0, "e": 10.0, "f": 50.0}
+
+    assert task_manager.rank_members(suitabilities, 4) == [("b", 70.0), ("d", 70.0), ("a", 50.0), ("c", 50.0)]
+    for k in range(1, 8):
+        assert task_manager.rank_members(suitabilities, k) == sorted(suitabilities.items(), key=lambda item: -item[1])[:k]
+
+def test_pick_assignee_follows_task_priority():
+    suitabilities = {"a": 50.0, "b": 70.0, "c": 50.0}
+
+    assert [task_manager.pick_assignee(suitabilities, priority) for priority in [1, 2, 3]] == ["b", "a", "c"]